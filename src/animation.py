@@ -0,0 +1,164 @@
+"""Sprite animation with a shared cache of derived sprite variants.
+
+Every scaled/flipped/rotated version of a sprite frame is built once by
+SpriteCache and reused, so drawing an animation costs a dict lookup and a blit
+instead of pygame.transform calls every frame. The cache is an LRU bounded by
+the pixel memory of the surfaces it holds.
+"""
+import collections
+
+import pygame
+
+AnimFrame = collections.namedtuple("AnimFrame", "frame scale rotation offset")
+AnimFrame.__new__.__defaults__ = (0, 1.0, 0, (0, 0))
+
+
+def surface_bytes(surf):
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+
+def split_strip(sheet, count):
+    """Split a horizontal sprite strip into count equally sized frames."""
+    w = sheet.get_width() // count
+    h = sheet.get_height()
+    return [sheet.subsurface(pygame.Rect(i * w, 0, w, h)).copy() for i in range(count)]
+
+
+class SpriteCache:
+    """LRU cache of sprite variants keyed by (source, scale, flip, rotation, frame)."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sources = {}
+        self._variants = collections.OrderedDict()
+
+    def register(self, name, frames):
+        """Register a source sprite (a Surface or a list of frame Surfaces)."""
+        if isinstance(frames, pygame.Surface):
+            frames = [frames]
+        self._sources[name] = list(frames)
+        self.invalidate(name)
+
+    def has(self, name):
+        return name in self._sources
+
+    def frame_count(self, name):
+        return len(self._sources[name])
+
+    def invalidate(self, name):
+        for key in [k for k in self._variants if k[0] == name]:
+            self.bytes -= surface_bytes(self._variants.pop(key))
+
+    def variant(self, name, scale=1.0, flip=False, rotation=0, frame=0):
+        # quantise so nearby values share an entry and the key space stays small
+        key = (name, round(scale, 2), bool(flip), int(round(rotation)) % 360, frame % len(self._sources[name]))
+        surf = self._variants.get(key)
+        if surf is not None:
+            self._variants.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = self._build(*key)
+        self._variants[key] = surf
+        self.bytes += surface_bytes(surf)
+        self._evict()
+        return surf
+
+    def _build(self, name, scale, flip, rotation, frame):
+        surf = self._sources[name][frame]
+        if scale != 1.0:
+            size = (max(1, round(surf.get_width() * scale)), max(1, round(surf.get_height() * scale)))
+            surf = pygame.transform.smoothscale(surf, size)
+        if flip:
+            surf = pygame.transform.flip(surf, True, False)
+        if rotation:
+            surf = pygame.transform.rotate(surf, rotation)
+        return surf
+
+    def _evict(self):
+        # always keep the newest entry, even if it alone exceeds the budget
+        while self.bytes > self.max_bytes and len(self._variants) > 1:
+            _, surf = self._variants.popitem(last=False)
+            self.bytes -= surface_bytes(surf)
+            self.evictions += 1
+
+    def stats(self):
+        return {"entries": len(self._variants), "bytes": self.bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+class Animation:
+    """A sequence of AnimFrames played at a fixed rate."""
+
+    def __init__(self, frames, fps=8, loop=True):
+        self.frames = [f if isinstance(f, AnimFrame) else AnimFrame(f) for f in frames]
+        self.fps = fps
+        self.loop = loop
+
+    def frame_at(self, t):
+        i = int(t * self.fps)
+        if self.loop:
+            i %= len(self.frames)
+        else:
+            i = min(i, len(self.frames) - 1)
+        return self.frames[i]
+
+
+def idle_animation(frame_count=1, fps=4):
+    """Idle: cycle the source frames, or a gentle breathing scale for a single frame."""
+    if frame_count > 1:
+        return Animation(range(frame_count), fps)
+    return Animation([AnimFrame(scale=1.0), AnimFrame(scale=1.02), AnimFrame(scale=1.04), AnimFrame(scale=1.02)], fps)
+
+
+def walk_animation(frame_count=1, fps=10):
+    """Walk: cycle the source frames, or a waddle (tilt and bob) for a single frame."""
+    if frame_count > 1:
+        return Animation(range(frame_count), fps)
+    return Animation([
+        AnimFrame(rotation=0, offset=(0, 0)),
+        AnimFrame(rotation=6, offset=(0, -3)),
+        AnimFrame(rotation=0, offset=(0, 0)),
+        AnimFrame(rotation=-6, offset=(0, -3)),
+    ], fps)
+
+
+class AnimationPlayer:
+    """Plays named animations of one cached source sprite."""
+
+    def __init__(self, cache, source, animations, state):
+        self.cache = cache
+        self.source = source
+        self.animations = animations
+        self.state = state
+        self.time = 0.0
+
+    def set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.time = 0.0
+
+    def update(self, dt):
+        self.time += dt
+
+    def warm(self, flips=(False, True)):
+        """Build every variant the animations can show, so play never transforms."""
+        for anim in self.animations.values():
+            for f in anim.frames:
+                for flip in flips:
+                    self.cache.variant(self.source, f.scale, flip, f.rotation, f.frame)
+
+    def draw(self, surface, center, flip=False):
+        f = self.animations[self.state].frame_at(self.time)
+        sprite = self.cache.variant(self.source, f.scale, flip, f.rotation, f.frame)
+        rect = sprite.get_rect(center=(center[0] + f.offset[0], center[1] + f.offset[1]))
+        surface.blit(sprite, rect.topleft)
+        return rect
+
+
+# shared cache for all game sprites
+sprite_cache = SpriteCache()
@@ -0,0 +1,215 @@
+"""Bitmap text rendering from a glyph atlas.
+
+The font is rasterised once into a single white atlas surface. A string is
+assembled from glyph rectangles of the atlas with one blits() call, and the
+most recently used lines are kept, so text that doesn't change between frames
+costs a single blit instead of a font.render call. The atlas and its glyph
+table are saved to a cache directory, so later launches load one PNG and never
+open or rasterise the font. Each text color gets its own tinted copy of the
+atlas, built the first time that color is used.
+"""
+import collections
+import hashlib
+import json
+import os
+
+import pygame
+
+import log
+
+logger = log.get("assets")
+
+FORMAT = 1
+# printable ASCII plus Latin-1, enough for names like "Pokémon"
+CHARSET = "".join(chr(c) for c in range(32, 127)) + "".join(chr(c) for c in range(161, 256))
+ATLAS_WIDTH = 512
+LINE_CACHE_SIZE = 256  # assembled (text, color) lines kept for reuse
+WHITE = (255, 255, 255)
+
+
+class BitmapFont:
+    def __init__(self, name=None, size=20, charset=CHARSET, cache_dir=None, antialias=True):
+        self.name = name
+        self.size_px = size
+        self.antialias = antialias
+        self.loaded_from_cache = False
+        self._font = None
+        self._tinted = {}
+        self._lines = collections.OrderedDict()
+        self._glyphs = {}
+        # shelf packing cursor: x, y and height of the current row
+        self._cursor = [0, 0, 0]
+        self.atlas = None
+        self.height = 0
+        self.line_height = 0
+
+        cache_path = None
+        if cache_dir:
+            cache_path = os.path.join(cache_dir, f"glyphs-{self._cache_key(charset)}")
+            self.loaded_from_cache = self._load(cache_path)
+        if not self.loaded_from_cache:
+            self._build(charset)
+            if cache_path:
+                self._save(cache_path)
+
+    def _cache_key(self, charset):
+        font_id = self.name or pygame.font.get_default_font()
+        key = f"{FORMAT}|{font_id}|{self.size_px}|{self.antialias}|{pygame.version.ver}|{charset}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def _pygame_font(self):
+        # only needed when glyphs have to be rasterised
+        if self._font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._font = pygame.font.Font(self.name, self.size_px)
+        return self._font
+
+    # --- atlas building ---
+    def _rasterise(self, ch):
+        try:
+            return self._pygame_font().render(ch, self.antialias, WHITE)
+        except pygame.error:
+            # zero-width characters (soft hyphen, combining marks) can't be rendered alone
+            return pygame.Surface((0, self.height), pygame.SRCALPHA)
+
+    def _build(self, charset):
+        font = self._pygame_font()
+        self.height = font.get_height()
+        self.line_height = font.get_linesize()
+        glyphs = [(ch, self._rasterise(ch)) for ch in charset]
+        for ch, surf in glyphs:
+            self._glyphs[ch] = self._place(*surf.get_size())
+        self.atlas = pygame.Surface((ATLAS_WIDTH, max(1, self._cursor[1] + self._cursor[2])), pygame.SRCALPHA)
+        for ch, surf in glyphs:
+            # MAX onto the cleared atlas copies the glyph as is; a normal
+            # alpha blit would darken the antialiased edges
+            self.atlas.blit(surf, self._glyphs[ch], special_flags=pygame.BLEND_RGBA_MAX)
+
+    def _place(self, w, h):
+        x, y, row_h = self._cursor
+        if x + w > ATLAS_WIDTH:
+            x, y, row_h = 0, y + row_h, 0
+        self._cursor = [x + w, y, max(row_h, h)]
+        return pygame.Rect(x, y, w, h)
+
+    def _add_glyph(self, ch):
+        """Rasterise a character that isn't in the atlas yet and grow the atlas."""
+        surf = self._rasterise(ch)
+        rect = self._place(*surf.get_size())
+        needed = self._cursor[1] + self._cursor[2]
+        if needed > self.atlas.get_height():
+            grown = pygame.Surface((ATLAS_WIDTH, needed), pygame.SRCALPHA)
+            grown.blit(self.atlas, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.atlas = grown
+        self.atlas.blit(surf, rect, special_flags=pygame.BLEND_RGBA_MAX)
+        self._glyphs[ch] = rect
+        self._tinted.clear()
+        return rect
+
+    # --- disk cache ---
+    def _load(self, path):
+        if not (os.path.exists(path + ".png") and os.path.exists(path + ".json")):
+            return False
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format") != FORMAT:
+                return False
+            atlas = pygame.image.load(path + ".png")
+            if pygame.display.get_surface() is not None:
+                atlas = atlas.convert_alpha()
+        except Exception as e:
+            logger.warning("couldn't load glyph cache %s (%s); rebuilding", path, e)
+            return False
+        self.atlas = atlas
+        self.height = meta["height"]
+        self.line_height = meta["line_height"]
+        self._cursor = meta["cursor"]
+        self._glyphs = {ch: pygame.Rect(r) for ch, r in meta["glyphs"].items()}
+        return True
+
+    def _save(self, path):
+        meta = {
+            "format": FORMAT,
+            "height": self.height,
+            "line_height": self.line_height,
+            "cursor": self._cursor,
+            "glyphs": {ch: list(r) for ch, r in self._glyphs.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # image first, then the table: a cache entry only counts once both exist
+            pygame.image.save(self.atlas, path + ".tmp.png")
+            os.replace(path + ".tmp.png", path + ".png")
+            with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(path + ".json.tmp", path + ".json")
+        except Exception as e:
+            logger.warning("couldn't write glyph cache %s: %s", path, e)
+
+    # --- drawing ---
+    def _atlas_for(self, color):
+        color = tuple(color)[:3]
+        atlas = self._tinted.get(color)
+        if atlas is None:
+            # the game only uses a handful of text colors, so this stays small
+            atlas = self.atlas.copy()
+            if color != WHITE:
+                atlas.fill(color + (255,), special_flags=pygame.BLEND_RGBA_MULT)
+            self._tinted[color] = atlas
+        return atlas
+
+    def _glyph(self, ch):
+        rect = self._glyphs.get(ch)
+        return rect if rect is not None else self._add_glyph(ch)
+
+    def size(self, text):
+        return sum(self._glyph(ch).width for ch in text), self.height
+
+    def line(self, text, color=WHITE):
+        """The text as one Surface assembled from atlas glyphs; recent lines are cached."""
+        key = (text, tuple(color)[:3])
+        surf = self._lines.get(key)
+        if surf is not None:
+            self._lines.move_to_end(key)
+            return surf
+        surf = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        atlas = self._atlas_for(key[1])
+        placed = []
+        x = 0
+        for ch in text:
+            rect = self._glyphs[ch]
+            placed.append((atlas, (x, 0), rect, pygame.BLEND_RGBA_MAX))
+            x += rect.width
+        surf.blits(placed, doreturn=False)
+        self._lines[key] = surf
+        if len(self._lines) > LINE_CACHE_SIZE:
+            self._lines.popitem(last=False)
+        return surf
+
+    def draw(self, surface, text, pos, color=WHITE, anchor="topleft"):
+        """Draw one line of text; pos is the point given by anchor ("topleft", "center", ...)."""
+        surf = self.line(text, color)
+        rect = surf.get_rect()
+        setattr(rect, anchor, pos)
+        surface.blit(surf, rect)
+        return rect
+
+    def draw_lines(self, surface, lines, pos, color=WHITE, line_height=None):
+        """Draw many lines with a single blits() call.
+
+        lines holds strings or (text, color) pairs; returns the bounding rect.
+        """
+        line_height = line_height or self.line_height
+        x, y = pos
+        batch = []
+        width = 0
+        for i, line in enumerate(lines):
+            text, line_color = (line, color) if isinstance(line, str) else line
+            surf = self.line(text, line_color)
+            batch.append((surf, (x, y + i * line_height)))
+            width = max(width, surf.get_width())
+        surface.blits(batch, doreturn=False)
+        count = len(lines)
+        return pygame.Rect(x, y, width, (count - 1) * line_height + self.height if count else 0)
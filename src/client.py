@@ -2,25 +2,116 @@ import pygame
 import sys
 import os
 import random
-import requests
 
 # --- pygame setup ---
-import threading
-import asyncio
-import queue
 import json
 import time
-import traceback
-pygame.init()
+import argparse
+import log
+import messages
+from memprof import MemoryProfiler
+import net
+from netproc import NetProcess
+from telemetry import telemetry, PrometheusExporter
+import replay
+import timing
+from render_target import RenderTarget, parse_size
+from bitmap_font import BitmapFont
+from animation import sprite_cache, split_strip, AnimationPlayer, idle_animation, walk_animation
+from pacing import FramePacer, FPS_CAPS
+from spawns import Spawner
+
+# structured log (JSON lines) written by a background thread
+LOG_FILE = "game_client.log.jsonl"
+# log of the networking helper process (--net-process)
+NET_LOG_FILE = "game_client.net.log.jsonl"
+# memory/allocation diff report (--mem-profile)
+MEM_REPORT_FILE = "game_client.mem.txt"
+
+# --- command line: session recording / headless replay ---
+parser = argparse.ArgumentParser(description="Pokémon game client")
+parser.add_argument("--record", metavar="FILE", help="record input, rng seed and outgoing messages to FILE")
+parser.add_argument("--replay", metavar="FILE", help="re-run a recorded session headless at maximum speed")
+parser.add_argument("--fps", type=int, choices=FPS_CAPS, default=60, help="frame rate cap (0 = uncapped)")
+parser.add_argument("--no-throttle", action="store_true",
+                    help="keep the full frame rate while the scene is static or the window is inactive")
+parser.add_argument("--render-size", metavar="WxH", type=parse_size,
+                    help="draw at this logical resolution (e.g. 640x360) and scale it to a resizable window")
+parser.add_argument("--smooth-scale", action="store_true", help="filter when scaling the render size to the window")
+parser.add_argument("--log-level", metavar="SUBSYSTEM=LEVEL", action="append", type=str,
+                    help="per-subsystem log level, e.g. ws=DEBUG (repeatable)")
+parser.add_argument("--log-file", default=LOG_FILE, help="JSON-lines log file ('' to disable)")
+parser.add_argument("--message-budget", metavar="MS", type=float, default=2.0,
+                    help="time per frame spent handling server messages; the rest wait for the next frame")
+parser.add_argument("--mem-profile", metavar="FRAMES", type=int, default=0,
+                    help="trace memory, Surface allocations and queue depths; report every FRAMES frames")
+parser.add_argument("--net-process", action="store_true",
+                    help="run the websocket and HTTP calls in a helper process connected through shared memory")
+parser.add_argument("--enemies", metavar="N", type=int, default=1,
+                    help="number of wild pokémon on the map at once")
+args = parser.parse_args()
+try:
+    log_levels = log.parse_levels(args.log_level)
+except ValueError as e:
+    parser.error(str(e))
+log.setup(args.log_file, log_levels)
+log_auth = log.get("auth")
+log_assets = log.get("assets")
+log_api = log.get("api")
+log_replay = log.get("replay")
+log_perf = log.get("perf")
+
+mem_profiler = None
+if args.mem_profile > 0:
+    # started before anything else allocates so every Surface goes through the counter
+    mem_profiler = MemoryProfiler(MEM_REPORT_FILE, every=args.mem_profile)
+    mem_profiler.start()
+
 WINDOW_SIZE = (1280, 720)
-screen = pygame.display.set_mode(WINDOW_SIZE)
+recorder = None
+replayer = None
+if args.replay:
+    replayer = replay.Replayer(args.replay)
+    session_seed = replayer.seed
+    wall_offset = replayer.wall_offset
+    render_size = replayer.size
+    enemy_slots = replayer.enemies
+    # headless: no window, no audio
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+else:
+    session_seed = random.SystemRandom().getrandbits(63)
+    # game time is monotonic; this converts it to epoch seconds for the server
+    wall_offset = timing.wall_offset()
+    # logical resolution the game is drawn at
+    render_size = args.render_size or WINDOW_SIZE
+    enemy_slots = max(1, args.enemies)
+    if args.record:
+        recorder = replay.Recorder(args.record, session_seed, wall_offset, render_size, enemy_slots)
+        log_replay.info("recording session to %s", args.record)
+# all gameplay randomness (spawns, skill-check targets) comes from this seed
+random.seed(session_seed)
+
+pygame.init()
+if args.render_size or render_size != WINDOW_SIZE:
+    # everything draws into render_target.surface, scaled to the window once per frame
+    render_target = RenderTarget(render_size, WINDOW_SIZE, smooth=args.smooth_scale)
+    screen = render_target.surface
+else:
+    render_target = None
+    screen = pygame.display.set_mode(WINDOW_SIZE)
 pygame.display.set_caption("Pokémon Game")
 clock = pygame.time.Clock()
+input_timer = timing.InputTimer()
+pacer = FramePacer(fps_cap=args.fps, throttle=not args.no_throttle, input_timer=input_timer)
+# time from a key/mouse press to the flip of the frame that shows its effect
+input_latency = timing.LatencyStats()
 running = True
 dt = 0
 
 # API configuration
-API_URL = "http://127.0.0.1:8508"
+API_URL = net.API_URL
+WS_URL = net.WS_URL
 JWT_TOKEN = None
 USER_ID = None
 USERNAME = None
@@ -35,11 +126,11 @@ def load_token():
                 JWT_TOKEN = data.get("token")
                 USER_ID = data.get("userId")
                 USERNAME = data.get("username")
-                print(f"[auth] Loaded token for user: {USERNAME}")
+                log_auth.info("Loaded token for user: %s", USERNAME)
         else:
-            print("[auth] No token file found. Running without authentication.")
+            log_auth.info("No token file found. Running without authentication.")
     except Exception as e:
-        print(f"[auth] Error loading token: {e}")
+        log_auth.error("Error loading token: %s", e)
 
 load_token()
 
@@ -66,103 +157,86 @@ health = HEALTH_MAX
 # load background but keep the same image if available
 try:
     background = pygame.image.load("background.png").convert()
-    background = pygame.transform.scale(background, WINDOW_SIZE)  # scale to window
+    background = pygame.transform.scale(background, screen.get_size())  # scale to render size
 except Exception as e:
-    print(f"Warning: couldn't load background.png ({e}). Using generated grass.")
+    log_assets.warning("couldn't load background.png (%s). Using generated grass.", e)
     background = None
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 VULPIX_PATH = os.path.join(SCRIPT_DIR, "vulpix.png")
 ENEMY_PATH = os.path.join(SCRIPT_DIR, "enemy.png")
+# number of frames laid out horizontally in each sprite image (1 = single image,
+# which gets procedural idle/walk animations instead)
+VULPIX_FRAMES = 1
+ENEMY_FRAMES = 1
+
+
+def load_sprite_frames(path, frame_count, size):
+    sheet = pygame.image.load(path).convert_alpha()
+    return [pygame.transform.smoothscale(f, size) for f in split_strip(sheet, frame_count)]
+
 
-# player sprite (vulpix) and enemy sprite
-player_sprite = None
-player_sprite_flipped = None
+# player sprite (vulpix) and enemy sprite; variants (flipped, animated) come from sprite_cache
+player_anim = None
 player_facing_right = True
-enemy_sprite = None
+enemy_anim = None
 player_img_size = PLAYER_SIZE
 try:
-    player_sprite = pygame.image.load(VULPIX_PATH).convert_alpha()
-    # scale player sprite to fit the player size
-    player_sprite = pygame.transform.smoothscale(player_sprite, (PLAYER_SIZE, PLAYER_SIZE))
-    # precompute flipped version so we don't flip every frame
-    try:
-        player_sprite_flipped = pygame.transform.flip(player_sprite, True, False)
-    except Exception:
-        player_sprite_flipped = None
+    # scale player sprite frames to fit the player size
+    sprite_cache.register("player", load_sprite_frames(VULPIX_PATH, VULPIX_FRAMES, (PLAYER_SIZE, PLAYER_SIZE)))
+    player_anim = AnimationPlayer(sprite_cache, "player", {
+        "idle": idle_animation(VULPIX_FRAMES),
+        "walk": walk_animation(VULPIX_FRAMES),
+    }, "idle")
+    player_anim.warm()
 except Exception:
-    player_sprite = None
-    print(f"[assets] vulpix not found at {VULPIX_PATH}; using square placeholder")
+    player_anim = None
+    log_assets.warning("vulpix not found at %s; using square placeholder", VULPIX_PATH)
 
 try:
-    enemy_sprite = pygame.image.load(ENEMY_PATH).convert_alpha()
-    enemy_sprite = pygame.transform.smoothscale(enemy_sprite, (PLAYER_SIZE + 8, PLAYER_SIZE + 8))
+    sprite_cache.register("wild", load_sprite_frames(ENEMY_PATH, ENEMY_FRAMES, (PLAYER_SIZE + 8, PLAYER_SIZE + 8)))
+    enemy_anim = AnimationPlayer(sprite_cache, "wild", {"idle": idle_animation(ENEMY_FRAMES)}, "idle")
+    enemy_anim.warm(flips=(False,))
 except Exception:
-    enemy_sprite = None
-    print(f"[assets] enemy not found at {ENEMY_PATH}; using colored block placeholder")
-
-# enemy game state
-enemy_alive = True
-enemy_pos = pygame.Vector2(0, 0)
-enemy_rect = pygame.Rect(0, 0, 0, 0)
-
-def spawn_enemy():
-    global enemy_pos, enemy_rect, enemy_alive
-    margin = 64
-    w, h = screen.get_size()
-    attempts = 0
-    safe_dist = PLAYER_SIZE * 4
-    while attempts < 120:
-        ex = random.randint(margin, w - margin)
-        ey = random.randint(margin, h - margin)
-        pos = pygame.Vector2(ex, ey)
-        if pos.distance_to(player_pos) > safe_dist:
-            enemy_pos = pos
-            break
-        attempts += 1
-    # fallback: place somewhere
-    if attempts >= 120:
-        enemy_pos = pygame.Vector2(margin, margin)
-
-    # set rect
-    s = PLAYER_SIZE + 8
-    enemy_rect = pygame.Rect(0, 0, s, s)
-    enemy_rect.center = (int(enemy_pos.x), int(enemy_pos.y))
-    enemy_alive = True
-
-spawn_enemy()
-
-def send_pokemon_catch():
+    enemy_anim = None
+    log_assets.warning("enemy not found at %s; using colored block placeholder", ENEMY_PATH)
+
+# enemy game state: spawn points are precomputed over the map (keeping a margin
+# from the edges), enemies take free points away from the player and respawn
+# a random 3-7 s after being caught
+ENEMY_SIZE = PLAYER_SIZE + 8
+ENEMY_MARGIN = 64
+spawn_area = (ENEMY_MARGIN, ENEMY_MARGIN, screen.get_width() - 2 * ENEMY_MARGIN,
+              screen.get_height() - 2 * ENEMY_MARGIN)
+spawner = Spawner([spawn_area], min_dist=ENEMY_SIZE + 8, slots=enemy_slots, rng=random,
+                  safe_dist=PLAYER_SIZE * 4, respawn=(3.0, 7.0))
+# slots that find no free point retry from the first frame on (time 0 is always
+# due, and doesn't depend on the clock, so replays stay deterministic)
+spawner.spawn_all(0.0, player_pos)
+# slot whose skill check is running
+skill_slot = None
+
+
+def enemy_rect(slot):
+    rect = pygame.Rect(0, 0, ENEMY_SIZE, ENEMY_SIZE)
+    rect.center = (int(slot.pos[0]), int(slot.pos[1]))
+    return rect
+
+
+def send_pokemon_catch(name):
     """Send a request to the API to add a caught pokemon to the user's inventory."""
     global JWT_TOKEN
+    emit_message(replay.MSG_CATCH, {"pokemon": name})
+    if replayer:
+        return
+    if net_proc:
+        # the helper makes the HTTP call and checks the token
+        net_proc.catch(name)
+        return
     if not JWT_TOKEN:
-        print("[api] No token available, skipping pokemon catch submission")
+        log_api.info("No token available, skipping pokemon catch submission")
         return
-    
-    try:
-        headers = {
-            "Authorization": f"Bearer {JWT_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        payload = {}
-        response = requests.post(
-            f"{API_URL}/pokemon/add",
-            json=payload,
-            headers=headers,
-            timeout=5
-        )
-        if response.status_code == 200:
-            data = response.json()
-            print(f"[api] Pokemon caught! Total: {data.get('quantity', '?')}")
-        else:
-            print(f"[api] Failed to add pokemon: {response.status_code}")
-    except Exception as e:
-        print(f"[api] Error sending pokemon catch: {e}")
-
-# respawn settings
-respawn_min = 3.0
-respawn_max = 7.0
-next_spawn_time = None
+    net.add_pokemon(JWT_TOKEN, API_URL)
 
 skill_active = False
 skill_start_time = 0.0
@@ -180,112 +254,76 @@ enemy_name = os.path.splitext(os.path.basename(ENEMY_PATH))[0] if ENEMY_PATH els
 
 # cached procedurally generated grass surface (used when background is None)
 _grass_surface = None
-# NOTE: websocket url is set to localhost so that others can clone and test the code. normally, this points to our production server.
-WS_URL = "ws://127.0.0.1:8508/ws"
-
-
-class WebSocketClient:
-    def __init__(self, url=WS_URL):
-        self.url = url
-        self._send_q = queue.Queue()
-        self._thread = None
-        self._running = False
-        self._use_real = False
-
-        try:
-            import websockets  # type: ignore
-            self._use_real = True
-            self._websockets = websockets
-        except Exception:
-            self._use_real = False
-
-    def start(self):
-        if self._thread and self._thread.is_alive():
-            return
-        self._running = True
-        if self._use_real:
-            self._thread = threading.Thread(target=self._run_async, daemon=True)
-        else:
-            self._thread = threading.Thread(target=self._run_dummy, daemon=True)
-        self._thread.start()
-
-    def stop(self):
-        self._running = False
-        # put a sentinel to unblock queue.get
-        try:
-            self._send_q.put_nowait(None)
-        except Exception:
-            pass
-        if self._thread:
-            self._thread.join(timeout=1.0)
-
-    def send_state(self, state: dict):
-        try:
-            self._send_q.put_nowait(state)
-        except Exception:
-            print("[ws] failed to queue state")
-
-    def _run_dummy(self):
-        print("[ws] ws client running — messages will be logged")
-        while self._running:
-            try:
-                item = self._send_q.get(timeout=0.2)
-            except queue.Empty:
-                continue
-            if item is None:
-                break
-            try:
-                print("[ws] send:", json.dumps(item))
-            except Exception:
-                print("[ws] send error")
-
-    def _run_async(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(self._async_main())
-        except Exception:
-            print("[ws] async loop terminated:")
-            traceback.print_exc()
-        finally:
-            try:
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            except Exception:
-                pass
-            loop.close()
-
-    async def _async_main(self):
-        ws_lib = self._websockets
-        while self._running:
-            try:
-                print(f"[ws] connecting to {self.url} ...")
-                async with ws_lib.connect(self.url) as ws:
-                    print("[ws] connected")
-                    while self._running:
-                        try:
-                            item = await asyncio.get_event_loop().run_in_executor(
-                                None, lambda: self._send_q.get(timeout=0.25)
-                            )
-                        except Exception:
-                            item = None
-
-                        if item is None:
-                            await asyncio.sleep(0)
-                            continue
-
-                        try:
-                            payload = json.dumps(item)
-                            await ws.send(payload)
-                        except Exception:
-                            print("[ws] send failed, will attempt reconnect")
-                            break
-            except Exception:
-                print("[ws] connection error, retrying in 1s")
-                await asyncio.sleep(1.0)
-
-
-ws_client = WebSocketClient(WS_URL)
-ws_client.start()
+# network telemetry: prometheus text file for the node exporter textfile collector
+TELEMETRY_FILE = "game_client.prom"
+TELEMETRY_INTERVAL = 10.0  # seconds between file writes
+
+
+def emit_message(kind, payload):
+    """Log an outgoing message to the session recording or check it against the replay."""
+    if recorder:
+        recorder.message(kind, payload)
+    elif replayer:
+        replayer.message(kind, payload)
+
+
+# server messages are decoded on the network thread and handled in the main
+# loop, at most --message-budget ms per frame
+dispatcher = messages.Dispatcher(budget=args.message_budget / 1000)
+# other players pushed by the server: user -> (x, y, health)
+remote_players = {}
+
+
+@dispatcher.on(messages.InventoryUpdate)
+def on_inventory_update(msg):
+    inventory[:] = list(msg.items)
+
+
+@dispatcher.on(messages.Spawn)
+def on_spawn(msg):
+    # never move the enemy a running skill check is about
+    spawner.place((msg.x, msg.y), msg.name, keep=skill_slot if skill_active else None)
+
+
+@dispatcher.on(messages.Chat)
+def on_chat(msg):
+    global popup_text, popup_until
+    popup_text = f"{msg.sender}: {msg.text}"
+    popup_until = now + 3.0
+
+
+@dispatcher.on(messages.PlayerUpdate)
+def on_player_update(msg):
+    remote_players[msg.user] = (msg.x, msg.y, msg.health)
+
+
+@dispatcher.on(messages.PlayerLeft)
+def on_player_left(msg):
+    remote_players.pop(msg.user, None)
+
+
+net_proc = None
+telemetry_exporter = None
+if args.net_process and not replayer:
+    # websocket, HTTP and telemetry file all live in the helper; the game only
+    # writes fixed-size records into shared memory
+    net_proc = NetProcess(API_URL, WS_URL, JWT_TOKEN, TELEMETRY_FILE, NET_LOG_FILE if args.log_file else None,
+                          on_message=dispatcher.post)
+    ws_client = net_proc
+else:
+    ws_client = net.WebSocketClient(WS_URL, on_message=dispatcher.post)
+    # a replay never connects, so it has nothing real to export
+    if not replayer:
+        telemetry_exporter = PrometheusExporter(telemetry, TELEMETRY_FILE, TELEMETRY_INTERVAL)
+        telemetry_exporter.start()
+if not replayer:
+    ws_client.start()
+if mem_profiler:
+    mem_profiler.track_queue("ws send", ws_client.pending)
+    mem_profiler.track_queue("inbound messages", dispatcher.pending)
+    mem_profiler.track_queue("log records", log.queued)
+# debug overlay with network stats, toggled with F3
+telemetry_overlay_open = False
 _last_send_time = 0.0
 _send_interval = 0.5  # seconds
 def generate_grass_surface(size, tile_size=8, seed=None):
@@ -328,7 +366,9 @@ def generate_grass_surface(size, tile_size=8, seed=None):
 
     return surf
 
-font = pygame.font.SysFont(None, 20)
+# glyph atlas of the default font, cached on disk so later launches skip rasterising
+FONT_CACHE_DIR = "glyph_cache"
+font = BitmapFont(None, 20, cache_dir=FONT_CACHE_DIR)
 
 def draw_ui():
     # subtle border around the screen (outline so it doesn't cover content)
@@ -343,15 +383,12 @@ def draw_ui():
     pygame.draw.rect(hud_surf, (200, 200, 200), hud_surf.get_rect(), 2)
 
     # title
-    title_surf = font.render("Player", True, (240, 240, 240))
-    hud_surf.blit(title_surf, (8, 6))
+    font.draw(hud_surf, "Player", (8, 6), (240, 240, 240))
 
     # coordinates and instructions
     coords = f"x: {int(player_pos.x)}  y: {int(player_pos.y)}"
-    coords_surf = font.render(coords, True, (200, 200, 200))
-    instr_surf = font.render("Move: W A S D", True, (180, 180, 180))
-    hud_surf.blit(coords_surf, (8, 24))
-    hud_surf.blit(instr_surf, (110, 24))
+    font.draw(hud_surf, coords, (8, 24), (200, 200, 200))
+    font.draw(hud_surf, "Move: W A S D", (110, 24), (180, 180, 180))
 
     # blit HUD to main screen
     screen.blit(hud_surf, (hud_rect.x, hud_rect.y))
@@ -373,9 +410,7 @@ def draw_inventory_button(mouse_pos=None):
     pygame.draw.rect(screen, color, btn_rect, border_radius=8)
     pygame.draw.rect(screen, (30, 30, 30), btn_rect, 2, border_radius=8)
 
-    label = font.render("Inventory", True, BUTTON_TEXT)
-    label_rect = label.get_rect(center=btn_rect.center)
-    screen.blit(label, label_rect)
+    font.draw(screen, "Inventory", btn_rect.center, BUTTON_TEXT, anchor="center")
     return btn_rect
 
 
@@ -404,12 +439,10 @@ def draw_health_bar():
 
     # text (vertically centered within the bar, slightly lowered)
     txt = f"HP {int(health)}/{HEALTH_MAX}"
-    txt_surf = font.render(txt, True, (240, 240, 240))
-    txt_rect = txt_surf.get_rect()
     # position text so it's left-aligned with a small inset and vertically centered
     txt_x = x + 8
-    txt_y = y + (bar_h - txt_rect.height) // 2 + 1
-    screen.blit(txt_surf, (txt_x, txt_y))
+    txt_y = y + (bar_h - font.height) // 2 + 1
+    font.draw(screen, txt, (txt_x, txt_y), (240, 240, 240))
 
 
 
@@ -430,36 +463,151 @@ def draw_inventory_modal():
     pygame.draw.rect(screen, (160, 160, 160), modal_rect, 2, border_radius=8)
 
     # title
-    title = font.render("Inventory", True, (40, 40, 40))
-    screen.blit(title, (modal_rect.x + 16, modal_rect.y + 12))
+    font.draw(screen, "Inventory", (modal_rect.x + 16, modal_rect.y + 12), (40, 40, 40))
 
-    # inventory list
+    # inventory list, drawn in one batch
     list_x = modal_rect.x + 20
     list_y = modal_rect.y + 48
     if inventory:
-        for i, item in enumerate(inventory):
-            it_surf = font.render(f"- {item}", True, (40, 40, 40))
-            screen.blit(it_surf, (list_x, list_y + i * 22))
+        font.draw_lines(screen, [f"- {item}" for item in inventory], (list_x, list_y), (40, 40, 40), line_height=22)
     else:
-        none_surf = font.render("(empty)", True, (120, 120, 120))
-        screen.blit(none_surf, (list_x, list_y))
+        font.draw(screen, "(empty)", (list_x, list_y), (120, 120, 120))
 
     # close button (top-right of modal)
     cb_w, cb_h = 28, 24
     cb_rect = pygame.Rect(modal_rect.right - cb_w - 12, modal_rect.y + 10, cb_w, cb_h)
     pygame.draw.rect(screen, (200, 60, 60), cb_rect, border_radius=6)
     pygame.draw.rect(screen, (30, 30, 30), cb_rect, 1, border_radius=6)
-    x_surf = font.render("X", True, (255, 255, 255))
-    x_rect = x_surf.get_rect(center=cb_rect.center)
-    screen.blit(x_surf, x_rect)
+    font.draw(screen, "X", cb_rect.center, (255, 255, 255), anchor="center")
 
     return modal_rect, cb_rect
 
 
+def _fmt_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def draw_telemetry_overlay():
+    """Draws the network debug overlay in the top-right corner."""
+    s = net_proc.snapshot() if net_proc else telemetry.snapshot()
+    lines = [
+        "Network (F3)",
+        f"ws: {'connected' if s['connected'] else 'disconnected'}  reconnects: {s['reconnects']}",
+        f"rtt: {_fmt_ms(s['rtt_last'])}  avg {_fmt_ms(s['rtt_avg'])}  max {_fmt_ms(s['rtt_max'])}",
+        f"send: {s['sent_msgs_per_s']:.1f} msg/s  {s['sent_bytes_per_s']:.0f} B/s",
+        f"queue: {s['queue_depth']}  errors: {s['connection_errors']}",
+    ]
+    if net_proc:
+        lines.append(f"net process: ring drops {s['ring_dropped']}")
+    ds = dispatcher.stats()
+    lines.append(f"inbound: {ds['handled']} msgs  queue {ds['pending']}  drop {ds['dropped']}  "
+                 f"defer {ds['deferred_frames']}")
+    es = spawner.stats()
+    lines.append(f"enemies: {es['alive']}/{es['slots']}  respawns {es['pending']}  "
+                 f"free {es['free_points']}/{es['points']}")
+    ps = pacer.stats()
+    cap = args.fps or "uncapped"
+    lines.append(f"frame: {ps['fps']:.0f} fps ({ps['mode']}, cap {cap})  cpu {ps['cpu_ms']:.2f} ms")
+    lat = input_latency.summary()
+    lines.append(f"input->display: p50 {_fmt_ms(lat['p50'])}  p99 {_fmt_ms(lat['p99'])}")
+    for ep, v in sorted(s["http"].items()):
+        avg = v["sum"] / v["count"] if v["count"] else None
+        lines.append(f"{ep}: last {_fmt_ms(v['last'])}  avg {_fmt_ms(avg)}  n={v['count']}")
+
+    line_h = 18
+    box_w = 340
+    box_h = 12 + line_h * len(lines)
+    box = pygame.Surface((box_w, box_h), pygame.SRCALPHA)
+    box.fill((0, 0, 0, 170))
+    pygame.draw.rect(box, (200, 200, 200), box.get_rect(), 1)
+    colored = [(line, (240, 240, 240) if i == 0 else (200, 220, 200)) for i, line in enumerate(lines)]
+    font.draw_lines(box, colored, (8, 6), line_height=line_h)
+    screen.blit(box, (screen.get_width() - box_w - 16, 16))
+
+
+# keys that drive movement; their state is stored per frame in recordings
+MOVE_KEYS = (pygame.K_w, pygame.K_UP, pygame.K_s, pygame.K_DOWN,
+             pygame.K_a, pygame.K_LEFT, pygame.K_d, pygame.K_RIGHT)
+
+
+def _record_events(events):
+    out = []
+    for event, t in events:
+        if event.type == pygame.QUIT:
+            out.append(replay.Event(replay.EV_QUIT, t, 0, 0, 0, 0))
+        elif event.type == pygame.KEYDOWN:
+            out.append(replay.Event(replay.EV_KEYDOWN, t, event.key, 0, 0, 0))
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            out.append(replay.Event(replay.EV_MOUSEDOWN, t, 0, event.button, event.pos[0], event.pos[1]))
+    return out
+
+
+def _replay_events(recorded):
+    out = []
+    for ev in recorded:
+        if ev.kind == replay.EV_QUIT:
+            out.append((pygame.event.Event(pygame.QUIT), ev.time))
+        elif ev.kind == replay.EV_KEYDOWN:
+            out.append((pygame.event.Event(pygame.KEYDOWN, key=ev.key), ev.time))
+        elif ev.kind == replay.EV_MOUSEDOWN:
+            out.append((pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=ev.button, pos=(ev.x, ev.y)), ev.time))
+    return out
+
+
+replay_started = time.perf_counter()
 while running:
-    
+
+    # gather this frame's input, either live or from the recording
+    if replayer:
+        if replayer.done:
+            break
+        frame = replayer.next_frame()
+        now = frame.now
+        dt = frame.dt
+        events = _replay_events(frame.events)
+        keys = replay.KeyMask(frame.keymask, MOVE_KEYS)
+        mouse_pos = frame.mouse
+        pygame.event.pump()
+    else:
+        now = timing.now()
+        # (event, arrival time) pairs
+        events = input_timer.get()
+        keys = pygame.key.get_pressed()
+        mouse_pos = pygame.mouse.get_pos()
+        if render_target:
+            # work in logical coordinates from here on
+            events = [(render_target.map_event(ev), t) for ev, t in events]
+            mouse_pos = render_target.to_logical(mouse_pos)
+        if recorder:
+            recorder.frame(now, dt, replay.key_mask(keys, MOVE_KEYS), mouse_pos, _record_events(events))
+
+    # server messages: fed from the recording, or live within this frame's budget
+    if replayer:
+        for data in frame.inbound:
+            try:
+                dispatcher.post(messages.decode(data))
+            except ValueError as e:
+                # the receive thread drops these live, so the replay does too
+                log_replay.warning("dropping recorded inbound message: %s", e)
+        dispatcher.drain_all()
+    else:
+        # reading the helper's ring decodes JSON too, so it shares the budget
+        inbound_start = timing.now()
+        if net_proc:
+            # catch requests made by the helper; it logs the details to NET_LOG_FILE
+            for ok, quantity in net_proc.poll(dispatcher.budget):
+                if not ok:
+                    log_api.warning("Failed to add pokemon (see %s)", NET_LOG_FILE)
+                else:
+                    # the helper already logged it at INFO
+                    log_api.debug("Pokemon caught! Total: %s", "?" if quantity is None else quantity)
+        handled = dispatcher.drain(max(0.0, dispatcher.budget - (timing.now() - inbound_start)))
+        if recorder:
+            for msg in handled:
+                recorder.inbound(messages.encode(msg))
+
     # events
-    for event in pygame.event.get():
+    for event, event_time in events:
         if event.type == pygame.QUIT:
             running = False
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -478,11 +626,14 @@ while running:
                 btn = draw_inventory_button((mx, my))
                 if btn.collidepoint((mx, my)):
                     inventory_open = True
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            telemetry_overlay_open = not telemetry_overlay_open
         elif event.type == pygame.KEYDOWN:
             # during skill-check, space/enter attempts the catch
             if skill_active and event.key in (pygame.K_SPACE, pygame.K_RETURN):
-                # evaluate skill marker position
-                elapsed = time.time() - skill_start_time
+                # evaluate skill marker position at the moment the key was pressed,
+                # not when this frame got around to handling it
+                elapsed = max(0.0, event_time - skill_start_time)
                 p = min(1.0, max(0.0, elapsed / skill_duration))
                 # ping-pong marker across the bar
                 if int(elapsed / skill_duration) % 2 == 1:
@@ -496,26 +647,23 @@ while running:
                     skill_result = 'success'
                     skill_active = False
                     # remove the enemy and add to inventory
-                    if enemy_alive:
-                        enemy_alive = False
-                        inventory.append(enemy_name)
-                        # clear enemy rect so it won't collide again and hide sprite
-                        enemy_rect.width = 0
-                        enemy_rect.height = 0
+                    if skill_slot is not None and skill_slot.alive:
+                        caught = skill_slot.name or enemy_name
+                        inventory.append(caught)
                         popup_text = "pokemon caught"
-                        popup_until = time.time() + 3.0
-                        # schedule next spawn at a random time between respawn_min/max
-                        next_spawn_time = time.time() + random.uniform(respawn_min, respawn_max)
+                        popup_until = now + 3.0
+                        # frees its spawn point and schedules the slot's respawn
+                        spawner.despawn(skill_slot, now)
                         # send catch to API
-                        send_pokemon_catch()
+                        send_pokemon_catch(caught)
+                    skill_slot = None
                 else:
                     skill_result = 'fail'
                     skill_active = False
                     popup_text = "missed!"
-                    popup_until = time.time() + 1.2
+                    popup_until = now + 1.2
 
         # input (continuous key state) -- blocked while in skill-check
-    keys = pygame.key.get_pressed()
     move = pygame.Vector2(0, 0)
     if not skill_active:
         if keys[pygame.K_w] or keys[pygame.K_UP]:
@@ -533,6 +681,13 @@ while running:
     elif move.x < 0:
         player_facing_right = False
 
+    # animation state follows movement
+    if player_anim:
+        player_anim.set_state("walk" if move.length_squared() > 0 else "idle")
+        player_anim.update(dt)
+    if enemy_anim:
+        enemy_anim.update(dt)
+
     # normalize to prevent faster diagonal movement
     if move.length_squared() > 0:
         move = move.normalize()
@@ -543,34 +698,39 @@ while running:
     player_pos.x = max(half + 8, min(screen.get_width() - half - 8, player_pos.x))
     player_pos.y = max(half + 8, min(screen.get_height() - half - 8, player_pos.y))
 
-    # if we're overlapping the enemy and it's alive, start skill-check
+    # if we're overlapping a live enemy, start skill-check; only enemies in the
+    # grid cells around the player are looked at
     player_rect = pygame.Rect(0, 0, PLAYER_SIZE, PLAYER_SIZE)
     player_rect.center = (int(player_pos.x), int(player_pos.y))
-    if enemy_alive and not skill_active and player_rect.colliderect(enemy_rect):
+    touching = None
+    if not skill_active:
+        for slot in spawner.near(player_pos, (PLAYER_SIZE + ENEMY_SIZE) * 0.75):
+            if player_rect.colliderect(enemy_rect(slot)):
+                touching = slot
+                break
+    if touching is not None:
         skill_active = True
-        skill_start_time = time.time()
+        skill_slot = touching
+        skill_start_time = now
         # place target somewhere along bar
         bar_left = (screen.get_width() - skill_bar_w) // 2
         skill_target_x = random.randint(bar_left + 16, bar_left + skill_bar_w - skill_target_w - 16)
         skill_result = None
 
-    # if we captured an enemy and a spawn time is scheduled, check whether to spawn the next one
-    if not enemy_alive and next_spawn_time is not None:
-        if time.time() >= next_spawn_time:
-            spawn_enemy()
-            # reset timer
-            next_spawn_time = None
+    # respawn the slots whose timers are due, away from the player
+    spawner.update(now, player_pos)
 
     # send periodic game state over websocket (non-blocking)
-    now = time.time()
     if now - _last_send_time >= _send_interval:
         state = {
             "x": int(player_pos.x),
             "y": int(player_pos.y),
             "health": int(health),
-            "inventory": inventory,
-            "timestamp": now,
+            # a copy: the send queue and the log writer serialize it later
+            "inventory": list(inventory),
+            "timestamp": now + wall_offset,
         }
+        emit_message(replay.MSG_STATE, state)
         try:
             ws_client.send_state(state)
         except Exception:
@@ -590,24 +750,24 @@ while running:
     # draw UI overlays first (HUD/background elements)
     draw_ui()
 
-    # draw enemy (if alive)
-    if enemy_alive:
-        # update rect center
-        enemy_rect.center = (int(enemy_pos.x), int(enemy_pos.y))
-        if enemy_sprite:
-            er = enemy_sprite.get_rect(center=enemy_rect.center)
-            screen.blit(enemy_sprite, er.topleft)
+    # draw live enemies
+    for slot in spawner.alive():
+        if enemy_anim:
+            enemy_anim.draw(screen, (int(slot.pos[0]), int(slot.pos[1])))
         else:
-            pygame.draw.rect(screen, (150, 40, 40), enemy_rect, border_radius=6)
+            pygame.draw.rect(screen, (150, 40, 40), enemy_rect(slot), border_radius=6)
+
+    # other players
+    for user, (ox, oy, _) in remote_players.items():
+        pygame.draw.circle(screen, (80, 120, 220), (int(ox), int(oy)), PLAYER_SIZE // 3)
+        font.draw(screen, user, (int(ox), int(oy) - PLAYER_SIZE // 3 - 2), (240, 240, 240), anchor="midbottom")
 
     # draw player sprite (or fallback square)
     rect = pygame.Rect(0, 0, PLAYER_SIZE, PLAYER_SIZE)
     rect.center = (int(player_pos.x), int(player_pos.y))
-    if player_sprite:
-        # draw flipped or normal sprite based on facing
-        sprite_to_draw = player_sprite_flipped if player_facing_right and player_sprite_flipped else player_sprite
-        sprite_rect = sprite_to_draw.get_rect(center=rect.center)
-        screen.blit(sprite_to_draw, sprite_rect.topleft)
+    if player_anim:
+        # the source art faces left, so flip it when facing right
+        player_anim.draw(screen, rect.center, flip=player_facing_right)
     else:
         # border
         pygame.draw.rect(screen, player_border, rect.inflate(4, 4), border_radius=6)
@@ -615,7 +775,6 @@ while running:
         pygame.draw.rect(screen, player_color, rect, border_radius=6)
 
     # draw inventory button above world so it's always clickable
-    mouse_pos = pygame.mouse.get_pos()
     btn_rect = draw_inventory_button(mouse_pos)
 
     # draw health bar bottom-left
@@ -623,7 +782,7 @@ while running:
 
     # skill-check overlay / timing
     if skill_active:
-        elapsed = time.time() - skill_start_time
+        elapsed = now - skill_start_time
         bar_left = (screen.get_width() - skill_bar_w) // 2
         bar_top = (screen.get_height() // 2) - 48
         bar_rect = pygame.Rect(bar_left, bar_top, skill_bar_w, skill_bar_h)
@@ -648,35 +807,75 @@ while running:
         pygame.draw.rect(screen, (240, 220, 80), marker_rect)
 
         inst = "Press [SPACE] when the marker is inside the green zone"
-        inst_surf = font.render(inst, True, (255, 255, 255))
-        inst_rect = inst_surf.get_rect(center=(screen.get_width() // 2, bar_top - 28))
-        screen.blit(inst_surf, inst_rect)
+        font.draw(screen, inst, (screen.get_width() // 2, bar_top - 28), (255, 255, 255), anchor="center")
 
         if elapsed > skill_duration * 2.5:
             skill_active = False
             skill_result = 'fail'
             popup_text = "missed!"
-            popup_until = time.time() + 1.2
+            popup_until = now + 1.2
 
-    if popup_text and time.time() < popup_until:
-        pop_surf = font.render(popup_text, True, (240, 240, 240))
-        pop_bg = pygame.Surface((pop_surf.get_width() + 14, pop_surf.get_height() + 10), pygame.SRCALPHA)
+    if popup_text and now < popup_until:
+        pop_w, pop_h = font.size(popup_text)
+        pop_bg = pygame.Surface((pop_w + 14, pop_h + 10), pygame.SRCALPHA)
         pop_bg.fill((40, 40, 40, 220))
         px = (screen.get_width() - pop_bg.get_width()) // 2
         py = 60
         pygame.draw.rect(pop_bg, (200, 200, 200), pop_bg.get_rect(), 1, border_radius=6)
         screen.blit(pop_bg, (px, py))
-        screen.blit(pop_surf, (px + 7, py + 6))
+        font.draw(screen, popup_text, (px + 7, py + 6), (240, 240, 240))
 
     if inventory_open:
         modal_rect, cb_rect = draw_inventory_modal()
+    if telemetry_overlay_open:
+        draw_telemetry_overlay()
+    if render_target:
+        render_target.present()
     pygame.display.flip()
-
-    dt = clock.tick(60) / 1000.0
+    if not replayer:
+        input_times = [t for ev, t in events if ev.type in timing.INPUT_EVENTS]
+        if input_times:
+            input_latency.add(timing.now() - min(input_times))
+    if mem_profiler:
+        mem_profiler.frame_end()
+
+    if replayer:
+        # replay runs as fast as possible; dt comes from the recording
+        clock.tick()
+    else:
+        # full rate while something is happening, throttled when static or unfocused
+        popup_visible = bool(popup_text) and now < popup_until
+        busy = (bool(events) or move.length_squared() > 0 or skill_active or popup_visible
+                or dispatcher.pending() > 0)
+        # wake up in time for the next timed change even while throttled
+        wake_times = [t for t in (popup_until if popup_visible else None, spawner.next_due()) if t is not None]
+        wake_in = min(wake_times) - now if wake_times else None
+        dt = pacer.tick(busy, wake_in)
+
+if pacer.frames:
+    log_perf.info("%d frames, avg cpu %.2f ms/frame", pacer.frames, pacer.cpu_total / pacer.frames * 1000)
+lat = input_latency.summary()
+if lat["count"]:
+    log_perf.info("input->display latency over %d inputs: p50 %s  p90 %s  p99 %s  max %s", lat["count"],
+                  _fmt_ms(lat["p50"]), _fmt_ms(lat["p90"]), _fmt_ms(lat["p99"]), _fmt_ms(lat["max"]))
+if recorder:
+    recorder.close()
+    log_replay.info("recorded %d frames to %s", recorder.frames, args.record)
+if replayer:
+    replayer.finish()
+    wall = time.perf_counter() - replay_started
+    frames = replayer.index + 1
+    log_replay.info("%d frames, %.1fs of play replayed in %.2fs (%.0f fps), %d message mismatches", frames,
+                    replayer.duration, wall, frames / wall if wall > 0 else 0, replayer.mismatches)
 
 try:
     ws_client.stop()
 except Exception:
     pass
+if telemetry_exporter:
+    telemetry_exporter.stop()
+if mem_profiler:
+    mem_profiler.stop()
+    log_perf.info("memory report written to %s", MEM_REPORT_FILE)
 
 pygame.quit()
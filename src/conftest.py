@@ -0,0 +1,16 @@
+import pytest
+
+from fake_backend import FakeBackend, port_in_use
+
+BACKEND_HOST = "127.0.0.1"
+BACKEND_PORT = 8508
+
+
+@pytest.fixture(scope="session", autouse=True)
+def backend():
+    """Serve the API tests from the fake backend unless a real server is running."""
+    if port_in_use(BACKEND_HOST, BACKEND_PORT):
+        yield None
+        return
+    with FakeBackend(BACKEND_HOST, BACKEND_PORT) as fake:
+        yield fake
@@ -0,0 +1,420 @@
+"""In-process stand-in for the game backend.
+
+Implements the HTTP endpoints the client and tests use (/auth/*, /pokemon/add)
+and the /ws websocket endpoint with nothing but the standard library, and can
+inject latency, jitter, dropped requests/messages and disconnects so client
+behaviour can be tested on degraded networks without a real server.
+
+Run standalone to play against it:
+
+    python fake_backend.py --port 8508 --latency 0.15 --jitter 0.05 --drop 0.05
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# websocket opcodes
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class NetworkConditions:
+    """Fault injection settings; can be changed while the backend is running.
+
+    latency/jitter: seconds added before each HTTP response or websocket reply.
+    drop_rate: chance an HTTP request gets no response or a websocket message is ignored.
+    disconnect_rate: chance a websocket connection is cut when a message arrives.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, drop_rate=0.0, disconnect_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.disconnect_rate = disconnect_rate
+
+
+class _WebSocket:
+    """Server side of one websocket connection."""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _read_exact(self, n):
+        data = self.rfile.read(n)
+        if len(data) != n:
+            raise ConnectionError("websocket closed")
+        return data
+
+    def recv_frame(self):
+        b1, b2 = self._read_exact(2)
+        opcode = b1 & 0x0F
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read_exact(8))[0]
+        mask = self._read_exact(4) if b2 & 0x80 else None
+        payload = self._read_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def send_frame(self, opcode, payload=b""):
+        header = bytes([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header += bytes([n])
+        elif n < 1 << 16:
+            header += bytes([126]) + struct.pack("!H", n)
+        else:
+            header += bytes([127]) + struct.pack("!Q", n)
+        with self._lock:
+            if self.closed:
+                return
+            self.wfile.write(header + payload)
+            self.wfile.flush()
+
+    def send_text(self, text):
+        self.send_frame(OP_TEXT, text.encode("utf-8"))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def backend(self):
+        return self.server.backend
+
+    # --- helpers ---
+    def _delay(self):
+        c = self.backend.conditions
+        delay = c.latency + (self.backend.rng.uniform(0, c.jitter) if c.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _dropped(self):
+        return self.backend.rng.random() < self.backend.conditions.drop_rate
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            data = json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.backend._log(self.command, self.path, status)
+
+    def _token_user(self):
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return None
+        return self.backend.tokens.get(auth[len("Bearer "):])
+
+    def _handle(self, routes):
+        if self._dropped():
+            # no response at all: the client sees the connection close
+            self.close_connection = True
+            self.backend._log(self.command, self.path, None)
+            return
+        self._delay()
+        route = routes.get(self.path.split("?", 1)[0])
+        if route is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+        route()
+
+    # --- HTTP verbs ---
+    def do_GET(self):
+        if self.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self._serve_websocket()
+            return
+        self._handle({
+            "/auth/test": lambda: self._send_json(200, {"status": "ok"}),
+            "/auth/version": lambda: self._send_json(200, {"version": "1.0.0", "status": "stable"}),
+            "/auth/profile": self._profile,
+        })
+
+    def do_POST(self):
+        self._handle({
+            "/auth/login": self._login,
+            "/auth/register": self._register,
+            "/pokemon/add": self._pokemon_add,
+        })
+
+    # --- endpoints ---
+    def _credentials(self):
+        data = self._read_json()
+        if data is None:
+            return None, None
+        # the tests send user/pass, the game client sends username/password
+        return data.get("username") or data.get("user"), data.get("password") or data.get("pass")
+
+    def _login(self):
+        username, password = self._credentials()
+        if not username or not password:
+            self._send_json(400, {"error": "Missing username or password"})
+            return
+        with self.backend.lock:
+            user = self.backend.users.get(username)
+            ok = user is not None and user["password"] == password
+            token = self.backend._issue_token(username) if ok else None
+        if not ok:
+            self._send_json(401, {"error": "Invalid username or password"})
+            return
+        self._send_json(200, {"token": token, "userId": user["id"], "username": username})
+
+    def _register(self):
+        username, password = self._credentials()
+        if not username or not password:
+            self._send_json(400, {"error": "Missing username or password"})
+            return
+        with self.backend.lock:
+            exists = username in self.backend.users
+            if not exists:
+                user = self.backend.add_user(username, password)
+                token = self.backend._issue_token(username)
+        if exists:
+            self._send_json(409, {"error": "User already exists"})
+            return
+        self._send_json(201, {
+            "message": "User created successfully",
+            "user": username,
+            "username": username,
+            "userId": user["id"],
+            "token": token,
+        })
+
+    def _profile(self):
+        username = self._token_user()
+        if username is None:
+            self._send_json(401, {"error": "Unauthorized"})
+            return
+        self._send_json(200, {"user": username, "role": self.backend.users[username]["role"]})
+
+    def _pokemon_add(self):
+        username = self._token_user()
+        if username is None:
+            self._send_json(401, {"error": "Unauthorized"})
+            return
+        self._read_json()
+        with self.backend.lock:
+            user = self.backend.users[username]
+            user["pokemon"] += 1
+            quantity = user["pokemon"]
+        self._send_json(200, {"quantity": quantity})
+
+    # --- websocket ---
+    def _serve_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key:
+            self._send_json(400, {"error": "Missing Sec-WebSocket-Key"})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.backend._log("GET", "/ws", 101)
+
+        ws = _WebSocket(self.rfile, self.wfile)
+        self.backend._add_ws(ws)
+        conditions = self.backend.conditions
+        try:
+            while not ws.closed:
+                opcode, payload = ws.recv_frame()
+                if opcode == OP_CLOSE:
+                    ws.send_frame(OP_CLOSE, payload[:2])
+                    break
+                if self.backend.rng.random() < conditions.disconnect_rate:
+                    # abrupt disconnect, no close frame
+                    self.backend.disconnects += 1
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    break
+                if self._dropped():
+                    continue
+                self._delay()
+                if opcode == OP_PING:
+                    ws.send_frame(OP_PONG, payload)
+                elif opcode == OP_TEXT:
+                    try:
+                        message = json.loads(payload.decode("utf-8"))
+                    except ValueError:
+                        message = payload.decode("utf-8", "replace")
+                    with self.backend.lock:
+                        self.backend.ws_messages.append(message)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with ws._lock:
+                ws.closed = True
+            self.backend._remove_ws(ws)
+
+
+class FakeBackend:
+    """Threaded fake backend; use as a context manager or call start()/stop()."""
+
+    def __init__(self, host="127.0.0.1", port=0, conditions=None, seed=None):
+        self.host = host
+        self.port = port
+        self.conditions = conditions or NetworkConditions()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.users = {}
+        self.tokens = {"valid_demo_token": "demoUser"}
+        self.requests = []  # (method, path, status); status None for dropped requests
+        self.ws_messages = []
+        self.disconnects = 0
+        self._sockets = []
+        self._server = None
+        self._thread = None
+        self.add_user("demoUser", "demoPass")
+        self.add_user("existingUser", "password")
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def add_user(self, username, password, role="trainer"):
+        user = {"id": len(self.users) + 1, "password": password, "role": role, "pokemon": 0}
+        self.users[username] = user
+        return user
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.backend = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if not self._server:
+            return
+        self.disconnect_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=1.0)
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def broadcast(self, message):
+        """Push a JSON message to every connected websocket client."""
+        text = json.dumps(message)
+        with self.lock:
+            sockets = list(self._sockets)
+        for ws in sockets:
+            try:
+                ws.send_text(text)
+            except OSError:
+                pass
+
+    def disconnect_all(self):
+        """Close every websocket connection (simulates a server restart)."""
+        with self.lock:
+            sockets = list(self._sockets)
+        for ws in sockets:
+            try:
+                ws.send_frame(OP_CLOSE, struct.pack("!H", 1001))
+            except OSError:
+                pass
+            with ws._lock:
+                ws.closed = True
+
+    @property
+    def ws_clients(self):
+        with self.lock:
+            return len(self._sockets)
+
+    # --- internal ---
+    def _issue_token(self, username):
+        token = uuid.uuid4().hex
+        self.tokens[token] = username
+        return token
+
+    def _log(self, method, path, status):
+        with self.lock:
+            self.requests.append((method, path, status))
+
+    def _add_ws(self, ws):
+        with self.lock:
+            self._sockets.append(ws)
+
+    def _remove_ws(self, ws):
+        with self.lock:
+            if ws in self._sockets:
+                self._sockets.remove(ws)
+
+
+def port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        return s.connect_ex((host, port)) == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake game backend with network fault injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8508)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay up to this many seconds")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability of dropping a request/message")
+    parser.add_argument("--disconnect", type=float, default=0.0, help="probability of cutting a websocket per message")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--push-burst", type=int, default=0, metavar="N",
+                        help="every second, push N remote player updates to the connected clients")
+    a = parser.parse_args()
+
+    conditions = NetworkConditions(a.latency, a.jitter, a.drop, a.disconnect)
+    backend = FakeBackend(a.host, a.port, conditions, a.seed).start()
+    print(f"[fake-backend] listening on {backend.url} (ws: {backend.ws_url})")
+    try:
+        while True:
+            time.sleep(1.0)
+            for i in range(a.push_burst):
+                backend.broadcast({"type": "player", "user": f"bot{i % 8}", "x": backend.rng.randrange(64, 1216),
+                                   "y": backend.rng.randrange(64, 656), "health": 100})
+    except KeyboardInterrupt:
+        pass
+    backend.stop()
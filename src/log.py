@@ -0,0 +1,198 @@
+"""Asynchronous, rate-limited structured logging for the client.
+
+Loggers live under "client.<subsystem>" (client.ws, client.api, ...). Records
+go through a bounded queue to a background writer thread, which formats them
+and writes JSON lines to a file plus short "[subsystem] message" lines to the
+console. A slow terminal or disk therefore only slows the writer thread, never
+the game or network threads. When the queue is full, records are dropped and
+counted instead of blocking. Repeats of the same message are rate limited
+before they are queued.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+ROOT = "client"
+
+# attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get(subsystem):
+    """Logger for one subsystem, e.g. get("ws")."""
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+def _subsystem(record):
+    return record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's extra= fields included."""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "subsystem": _subsystem(record),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        text = f"[{_subsystem(record)}] {record.getMessage()}"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (+{suppressed} similar suppressed)"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` records per message template every `period` seconds.
+
+    DEBUG records always pass: DEBUG is only on when asked for per subsystem,
+    and then every record (each with its own extra= data) is wanted.
+    """
+
+    def __init__(self, burst=5, period=30.0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._lock = threading.Lock()
+        # (logger, level, template) -> [window start, count, suppressed]
+        self._seen = {}
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG:
+            return True
+        template = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+        key = (record.name, record.levelno, template)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.period:
+                suppressed = state[2] if state else 0
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: it drops and counts when the queue is full."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # leave formatting to the writer thread; only capture traceback text now
+        # because the exception objects may change after this call returns
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+
+
+def setup(path="game_client.log.jsonl", levels=None, default_level="INFO", console_level="INFO",
+          max_queue=10000, burst=5, period=30.0):
+    """Install the queue handler and start the background writer.
+
+    levels maps subsystem names to level names, e.g. {"ws": "DEBUG"}.
+    """
+    global _listener, _handler
+    if _listener:
+        return
+    root = logging.getLogger(ROOT)
+    root.setLevel(default_level)
+    root.propagate = False
+    for subsystem, level in (levels or {}).items():
+        get(subsystem).setLevel(level.upper())
+
+    handlers = []
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(ConsoleFormatter())
+    handlers.append(console)
+    if path:
+        try:
+            file_handler = logging.FileHandler(path, encoding="utf-8")
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"[log] can't open {path} ({e}); logging to console only")
+
+    q = queue.Queue(max_queue)
+    _handler = DroppingQueueHandler(q)
+    _handler.addFilter(RateLimitFilter(burst, period))
+    root.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def dropped():
+    return _handler.dropped if _handler else 0
+
+
+def queued():
+    """Records waiting for the writer thread."""
+    return _handler.queue.qsize() if _handler else 0
+
+
+def shutdown():
+    """Flush pending records and stop the writer thread."""
+    global _listener
+    if not _listener:
+        return
+    if _handler.dropped:
+        get("log").warning("dropped %d records (queue full)", _handler.dropped)
+    _listener.stop()
+    _listener = None
+    for h in list(logging.getLogger(ROOT).handlers):
+        if h is _handler:
+            logging.getLogger(ROOT).removeHandler(h)
+
+
+def parse_levels(items):
+    """Parse ["ws=DEBUG", "api=WARNING"] into {"ws": "DEBUG", "api": "WARNING"}."""
+    levels = {}
+    for item in items or []:
+        name, sep, level = item.partition("=")
+        if not sep or not name or logging.getLevelName(level.upper()) == f"Level {level.upper()}":
+            raise ValueError(f"expected SUBSYSTEM=LEVEL, got {item!r}")
+        levels[name] = level.upper()
+    return levels
@@ -0,0 +1,234 @@
+"""Memory and allocation instrumentation for long play sessions (--mem-profile).
+
+While enabled, tracemalloc traces every Python allocation. Every N frames a
+snapshot is taken and compared with the previous one and with the first frame.
+The biggest growth by source line is appended to a plain-text report,
+together with:
+
+- Surface allocations per call site: pygame.Surface construction, .copy()
+  and the pygame.transform functions, averaged per frame over the window.
+  Transform calls that write into a given dest_surface allocate nothing and
+  aren't counted. .copy() is only seen on Surfaces built with the
+  pygame.Surface constructor while profiling; Surfaces pygame makes itself
+  (image.load, convert(), font.render, transform results) are plain C
+  Surfaces whose copy() can't be intercepted, so e.g. copying a loaded image
+  doesn't show up. Their allocations still appear in the tracemalloc diffs.
+- Queue depths: each registered queue is sampled every frame, and the report
+  shows the current and the maximum depth in the window.
+
+A leak shows up as a line whose "since start" growth keeps rising from report
+to report. Churn shows up as a call site with a steady allocations-per-frame
+count. Tracing slows the game down noticeably; it's meant for soak runs.
+"""
+import collections
+import os
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+import log
+
+logger = log.get("mem")
+
+# pygame.transform functions that return a new Surface
+TRANSFORMS = ("scale", "smoothscale", "rotate", "rotozoom", "flip", "scale2x")
+# positional index of dest_surface for the transforms that accept one
+DEST_ARG = {"scale": 2, "smoothscale": 2, "scale2x": 1}
+
+
+def _call_site(depth=2):
+    f = sys._getframe(depth)
+    return f"{os.path.basename(f.f_code.co_filename)}:{f.f_lineno} ({f.f_code.co_name})"
+
+
+def _fmt_bytes(n):
+    if abs(n) < 1024:
+        return f"{n:+d} B"
+    if abs(n) < 2**20:
+        return f"{n / 1024:+.1f} KiB"
+    return f"{n / 2**20:+.1f} MiB"
+
+
+class SurfaceCounter:
+    """Counts Surface allocations by call site while installed."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._originals = None
+
+    def install(self):
+        if self._originals:
+            return
+        counter = self
+        original_surface = pygame.Surface
+
+        class SurfaceMeta(type(original_surface)):
+            # surfaces made by pygame itself (image.load, font.render, ...) are
+            # plain Surfaces; keep isinstance(x, pygame.Surface) true for them
+            def __instancecheck__(cls, obj):
+                return isinstance(obj, original_surface)
+
+            def __subclasscheck__(cls, sub):
+                return issubclass(sub, original_surface)
+
+        class CountingSurface(original_surface, metaclass=SurfaceMeta):
+            def __init__(self, *args, **kwargs):
+                counter.counts[_call_site()] += 1
+                super().__init__(*args, **kwargs)
+
+            def copy(self):
+                counter.counts[_call_site()] += 1
+                return super().copy()
+
+        self._originals = {"Surface": original_surface}
+        pygame.Surface = CountingSurface
+        for name in TRANSFORMS:
+            fn = getattr(pygame.transform, name, None)
+            if fn is None:
+                continue
+            self._originals[name] = fn
+            setattr(pygame.transform, name, self._counting(fn, DEST_ARG.get(name)))
+
+    def _counting(self, fn, dest_arg=None):
+        def wrapper(*args, **kwargs):
+            # writing into a caller-supplied surface allocates nothing
+            into_dest = dest_arg is not None and (
+                kwargs.get("dest_surface") is not None or (len(args) > dest_arg and args[dest_arg] is not None))
+            if not into_dest:
+                self.counts[_call_site()] += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    def uninstall(self):
+        if not self._originals:
+            return
+        pygame.Surface = self._originals.pop("Surface")
+        for name, fn in self._originals.items():
+            setattr(pygame.transform, name, fn)
+        self._originals = None
+
+    def take(self):
+        """Return and reset the counts collected so far."""
+        counts, self.counts = self.counts, collections.Counter()
+        return counts
+
+
+class MemoryProfiler:
+    def __init__(self, path, every=600, top=15, trace_depth=1, count_surfaces=True):
+        self.path = path
+        self.every = every
+        self.top = top
+        self.trace_depth = trace_depth
+        self.frames = 0
+        self.surfaces = SurfaceCounter() if count_surfaces else None
+        self.surface_totals = collections.Counter()
+        self._queues = {}
+        self._queue_max = {}
+        self._baseline = None
+        self._previous = None
+        self._window_start = 0
+        self._started = None
+
+    def track_queue(self, name, depth):
+        """Sample depth() every frame and include it in the report."""
+        self._queues[name] = depth
+        self._queue_max[name] = 0
+
+    def start(self):
+        tracemalloc.start(self.trace_depth)
+        if self.surfaces:
+            self.surfaces.install()
+        self._started = time.perf_counter()
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(f"memory profile, snapshot every {self.every} frames\n")
+        logger.info("memory profiling to %s every %d frames", self.path, self.every)
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def frame_end(self):
+        """Call once per frame, after the flip."""
+        self.frames += 1
+        for name, depth in self._queues.items():
+            try:
+                self._queue_max[name] = max(self._queue_max[name], depth())
+            except Exception:
+                pass
+        if self._baseline is None:
+            # compare against the first frame so asset loading isn't counted as growth
+            self._baseline = self._previous = self._snapshot()
+            self._window_start = self.frames
+            if self.surfaces:
+                self.surfaces.take()
+            return
+        if self.frames - self._window_start >= self.every:
+            self.report()
+
+    def report(self):
+        if self._baseline is None:
+            return
+        snapshot = self._snapshot()
+        window = max(1, self.frames - self._window_start)
+        current, peak = tracemalloc.get_traced_memory()
+        since_start = snapshot.compare_to(self._baseline, "lineno")
+        since_last = snapshot.compare_to(self._previous, "lineno")
+        lines = [
+            "",
+            f"=== frame {self.frames} (+{time.perf_counter() - self._started:.0f}s) ===",
+            f"traced memory: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB), "
+            f"{_fmt_bytes(sum(s.size_diff for s in since_start))} since start, "
+            f"{_fmt_bytes(sum(s.size_diff for s in since_last))} since last snapshot",
+            "top growth since last snapshot:",
+        ]
+        lines += self._format_diff(since_last)
+        lines.append("top growth since start:")
+        lines += self._format_diff(since_start)
+        if self.surfaces:
+            counts = self.surfaces.take()
+            self.surface_totals.update(counts)
+            lines.append(f"surface allocations per frame (last {window} frames):")
+            if not counts:
+                lines.append("  none")
+            for site, n in counts.most_common(self.top):
+                lines.append(f"  {n / window:8.2f}/frame  {site}  (total {self.surface_totals[site]})")
+        if self._queues:
+            lines.append("queue depths (now / max in window):")
+            for name, depth in self._queues.items():
+                try:
+                    now = depth()
+                except Exception:
+                    now = "?"
+                lines.append(f"  {name}: {now} / {self._queue_max[name]}")
+                self._queue_max[name] = 0
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning("couldn't write %s: %s", self.path, e)
+        logger.info("memory snapshot at frame %d: %.1f MiB traced", self.frames, current / 2**20)
+        self._previous = snapshot
+        self._window_start = self.frames
+
+    def _format_diff(self, stats):
+        growth = [s for s in stats if s.size_diff > 0][:self.top]
+        if not growth:
+            return ["  none"]
+        return [f"  {_fmt_bytes(s.size_diff):>12} ({s.count_diff:+d} blocks)  {s.traceback[0]}" for s in growth]
+
+    def stop(self):
+        if self._started is None:
+            return
+        if self.frames > self._window_start:
+            self.report()
+        if self.surfaces:
+            self.surfaces.uninstall()
+        tracemalloc.stop()
+        self._started = None
@@ -0,0 +1,174 @@
+"""Typed server messages and the dispatcher that hands them to the game loop.
+
+The network thread decodes each websocket message into one of the message
+types below and posts it to a Dispatcher. Once per frame the game loop calls
+drain(), which runs the registered handlers until the frame's time budget is
+used up. Anything left over waits for the next frame, so a burst of messages is
+spread over several frames instead of causing a hitch.
+
+The queue is a collections.deque. append() and popleft() are atomic in
+CPython, so the network thread and the game loop never wait on a lock.
+
+Wire format: JSON objects with a "type" field and the message fields, e.g.
+{"type": "chat", "sender": "ash", "text": "hi"}.
+"""
+import collections
+import math
+
+import log
+import timing
+
+logger = log.get("dispatch")
+
+InventoryUpdate = collections.namedtuple("InventoryUpdate", "items")
+Spawn = collections.namedtuple("Spawn", "name x y")
+Chat = collections.namedtuple("Chat", "sender text")
+PlayerUpdate = collections.namedtuple("PlayerUpdate", "user x y health")
+PlayerLeft = collections.namedtuple("PlayerLeft", "user")
+
+# wire "type" -> message class
+TYPES = {
+    "inventory": InventoryUpdate,
+    "spawn": Spawn,
+    "chat": Chat,
+    "player": PlayerUpdate,
+    "player_left": PlayerLeft,
+}
+_NAMES = {cls: name for name, cls in TYPES.items()}
+
+
+def _number(value):
+    # bool is an int subclass, strings would parse; neither is a coordinate
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"expected a number, got {value!r}")
+    return float(value)
+
+
+def _integer(value):
+    return int(_number(value))
+
+
+def _text(value):
+    if isinstance(value, (dict, list)) or value is None:
+        raise ValueError(f"expected a string, got {value!r}")
+    return str(value)
+
+
+def _items(value):
+    if not isinstance(value, list):
+        raise ValueError(f"expected a list, got {type(value).__name__}")
+    return [_text(item) for item in value]
+
+
+# converter per field, in field order; each raises ValueError on a bad value
+FIELDS = {
+    InventoryUpdate: (_items,),
+    Spawn: (_text, _number, _number),
+    Chat: (_text, _text),
+    PlayerUpdate: (_text, _number, _number, _integer),
+    PlayerLeft: (_text,),
+}
+
+
+def decode(data):
+    """Build a typed message from a decoded JSON object; raises ValueError if it isn't one.
+
+    Field values are checked and converted (names to str, coordinates to
+    float, health to int), so handlers never see a mistyped field.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    cls = TYPES.get(data.get("type"))
+    if cls is None:
+        raise ValueError(f"unknown message type {data.get('type')!r}")
+    values = []
+    for field, convert in zip(cls._fields, FIELDS[cls]):
+        if field not in data:
+            raise ValueError(f"{data['type']} message is missing {field!r}")
+        try:
+            values.append(convert(data[field]))
+        except ValueError as e:
+            raise ValueError(f"{data['type']} message has a bad {field!r}: {e}") from None
+    return cls(*values)
+
+
+def encode(message):
+    """Inverse of decode(): the JSON object for a typed message."""
+    data = {"type": _NAMES[type(message)]}
+    data.update(message._asdict())
+    return data
+
+
+class Dispatcher:
+    """Queue of typed messages, drained by the game loop within a time budget."""
+
+    def __init__(self, budget=0.002, max_pending=4096):
+        self.budget = budget
+        self.max_pending = max_pending
+        self._queue = collections.deque()
+        self._handlers = {}
+        self.handled = 0
+        self.dropped = 0
+        self.unhandled = 0
+        self.deferred_frames = 0
+
+    def on(self, message_type, handler=None):
+        """Register the handler for a message type; usable as a decorator."""
+        if handler is None:
+            return lambda fn: self.on(message_type, fn)
+        self._handlers[message_type] = handler
+        return handler
+
+    def post(self, message):
+        """Queue a message; safe to call from any thread. Returns False if it was dropped."""
+        if len(self._queue) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self._queue.append(message)
+        return True
+
+    def pending(self):
+        return len(self._queue)
+
+    def drain(self, budget=None):
+        """Handle queued messages for up to budget seconds (self.budget by default).
+
+        At least one message is handled per call so the queue always makes
+        progress. Returns the handled messages in order.
+        """
+        budget = self.budget if budget is None else budget
+        deadline = timing.now() + budget
+        handled = []
+        while self._queue:
+            message = self._queue.popleft()
+            self._dispatch(message)
+            handled.append(message)
+            if timing.now() >= deadline:
+                break
+        if self._queue:
+            self.deferred_frames += 1
+        return handled
+
+    def drain_all(self):
+        handled = []
+        while self._queue:
+            message = self._queue.popleft()
+            self._dispatch(message)
+            handled.append(message)
+        return handled
+
+    def _dispatch(self, message):
+        handler = self._handlers.get(type(message))
+        self.handled += 1
+        if handler is None:
+            self.unhandled += 1
+            return
+        try:
+            handler(message)
+        except Exception:
+            # one bad message must not take the game down
+            logger.exception("handler for %s failed", type(message).__name__)
+
+    def stats(self):
+        return {"pending": len(self._queue), "handled": self.handled, "dropped": self.dropped,
+                "unhandled": self.unhandled, "deferred_frames": self.deferred_frames}
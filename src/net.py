@@ -0,0 +1,219 @@
+"""Client networking: the websocket state stream and the HTTP API calls.
+
+Kept free of pygame and game state so it can run either in the game process
+or in the networking helper process (see netproc.py).
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+
+import requests
+
+import log
+import messages
+from telemetry import telemetry
+
+log_api = log.get("api")
+log_ws = log.get("ws")
+
+# API configuration
+API_URL = "http://127.0.0.1:8508"
+# NOTE: websocket url is set to localhost so that others can clone and test the code. normally, this points to our production server.
+WS_URL = "ws://127.0.0.1:8508/ws"
+
+PING_INTERVAL = 2.0  # seconds between websocket RTT pings
+PING_TIMEOUT = 5.0
+
+
+class WebSocketClient:
+    def __init__(self, url=WS_URL, on_message=None):
+        self.url = url
+        # called from the network thread with each decoded server message
+        self.on_message = on_message
+        self._send_q = queue.Queue()
+        self._thread = None
+        self._running = False
+        self._use_real = False
+
+        try:
+            import websockets  # type: ignore
+            self._use_real = True
+            self._websockets = websockets
+        except Exception:
+            self._use_real = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        if self._use_real:
+            self._thread = threading.Thread(target=self._run_async, daemon=True)
+        else:
+            self._thread = threading.Thread(target=self._run_dummy, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        # put a sentinel to unblock queue.get
+        try:
+            self._send_q.put_nowait(None)
+        except Exception:
+            pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def send_state(self, state: dict):
+        try:
+            self._send_q.put_nowait(state)
+        except Exception:
+            log_ws.warning("failed to queue state")
+        telemetry.set_queue_depth(self._send_q.qsize())
+
+    def pending(self):
+        return self._send_q.qsize()
+
+    def _run_dummy(self):
+        log_ws.info("websockets not installed; ws client running offline (messages logged at DEBUG)")
+        while self._running:
+            try:
+                item = self._send_q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            telemetry.set_queue_depth(self._send_q.qsize())
+            # the writer thread does the json encoding, and only if DEBUG is on for ws
+            log_ws.debug("send", extra={"data": item})
+
+    def _run_async(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._async_main())
+        except Exception:
+            log_ws.exception("async loop terminated")
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            except Exception:
+                pass
+            loop.close()
+
+    async def _ping_loop(self, ws):
+        # measure round-trip time with websocket ping/pong frames
+        while self._running:
+            start = time.perf_counter()
+            try:
+                pong_waiter = await ws.ping()
+                await asyncio.wait_for(pong_waiter, timeout=PING_TIMEOUT)
+                telemetry.record_rtt(time.perf_counter() - start)
+            except asyncio.TimeoutError:
+                telemetry.record_ping_timeout()
+            except Exception:
+                return
+            await asyncio.sleep(PING_INTERVAL)
+
+    async def _recv_loop(self, ws):
+        # JSON decoding and message construction happen here, off the frame thread
+        try:
+            async for raw in ws:
+                telemetry.record_recv(len(raw))
+                if self.on_message is None:
+                    continue
+                try:
+                    message = messages.decode(json.loads(raw))
+                except ValueError as e:
+                    log_ws.warning("ignoring server message: %s", e)
+                    continue
+                self.on_message(message)
+        except Exception:
+            return
+
+    async def _async_main(self):
+        ws_lib = self._websockets
+        while self._running:
+            try:
+                log_ws.info("connecting to %s ...", self.url)
+                async with ws_lib.connect(self.url) as ws:
+                    log_ws.info("connected")
+                    telemetry.record_connected()
+                    ping_task = asyncio.ensure_future(self._ping_loop(ws))
+                    recv_task = asyncio.ensure_future(self._recv_loop(ws))
+                    try:
+                        while self._running:
+                            try:
+                                item = await asyncio.get_event_loop().run_in_executor(
+                                    None, lambda: self._send_q.get(timeout=0.25)
+                                )
+                            except Exception:
+                                item = None
+                            telemetry.set_queue_depth(self._send_q.qsize())
+
+                            if item is None:
+                                await asyncio.sleep(0)
+                                continue
+
+                            try:
+                                payload = json.dumps(item)
+                                await ws.send(payload)
+                                telemetry.record_send(len(payload.encode()))
+                            except Exception:
+                                log_ws.warning("send failed, will attempt reconnect")
+                                telemetry.record_disconnected(error=True)
+                                break
+                    finally:
+                        ping_task.cancel()
+                        recv_task.cancel()
+                telemetry.record_disconnected()
+            except Exception:
+                telemetry.record_disconnected(error=True)
+                log_ws.warning("connection error, retrying in 1s")
+                await asyncio.sleep(1.0)
+
+
+def _quantity(value):
+    # the server's count; anything that isn't a whole number is treated as unknown
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def add_pokemon(token, api_url=API_URL):
+    """Send a request to the API to add a caught pokemon to the user's inventory.
+
+    Returns (ok, quantity): ok is True when the server accepted the catch;
+    quantity is the new count as an int, or None if the response had none.
+    """
+    start = time.perf_counter()
+    try:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        payload = {}
+        response = requests.post(
+            f"{api_url}/pokemon/add",
+            json=payload,
+            headers=headers,
+            timeout=5
+        )
+        telemetry.record_http("/pokemon/add", time.perf_counter() - start, response.status_code)
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            quantity = _quantity(data.get("quantity")) if isinstance(data, dict) else None
+            log_api.info("Pokemon caught! Total: %s", "?" if quantity is None else quantity)
+            return True, quantity
+        log_api.warning("Failed to add pokemon: %s", response.status_code)
+    except Exception as e:
+        telemetry.record_http("/pokemon/add", time.perf_counter() - start, None)
+        log_api.error("Error sending pokemon catch: %s", e)
+    return False, None
@@ -0,0 +1,432 @@
+"""Networking helper process.
+
+Runs the websocket client and the HTTP API calls in a separate interpreter so
+JSON encoding, requests and the asyncio loop never hold the game's GIL. The
+game talks to it through two ShmRing buffers of fixed-layout records:
+
+    game -> net   STATE (x, y, health, timestamp, inventory size), CATCH (name),
+                  INVENTORY (the game's inventory), STOP
+    net -> game   CATCH_RESULT (ok, new quantity), TELEMETRY (overlay snapshot),
+                  MESSAGE (a server message, see messages.py)
+
+Server messages vary in shape, so a MESSAGE record carries the compact JSON of
+the typed message; ones that don't fit a slot are dropped and logged.
+
+The helper keeps its own copy of the inventory, so the state records stay
+fixed size. Whenever the game's inventory differs from what the helper last
+got (a catch, a server push), it is sent again as INVENTORY records: JSON
+lists, the first replacing the helper's copy and the rest appending to it. A
+sync that didn't fit in the ring is retried with the next state. It is started with subprocess (like login.py
+starts the client) rather than multiprocessing, because client.py runs the
+game at import time and can't be re-imported by a spawned child.
+
+NetProcess is the game-side handle; `python netproc.py ...` is the helper.
+"""
+import argparse
+import collections
+import json
+import math
+import os
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import log
+import messages
+import net
+import timing
+from shm_ring import ShmRing
+from telemetry import NetTelemetry, PrometheusExporter, telemetry
+
+logger = log.get("netproc")
+
+# record kinds (first byte of every record)
+REC_STATE = 1
+REC_CATCH = 2
+REC_STOP = 3
+REC_CATCH_RESULT = 4
+REC_TELEMETRY = 5
+REC_MESSAGE = 6
+REC_INVENTORY = 7
+
+# INVENTORY record flag
+INV_REPLACE = 0
+INV_APPEND = 1
+
+_STATE = struct.Struct("<BiihdH")
+_CATCH = struct.Struct("<B32s")
+_STOP = struct.Struct("<B")
+_CATCH_RESULT = struct.Struct("<B?i")
+# rtt last/avg/max, ping timeouts, send msg/s, send B/s, queue depth, connected,
+# reconnects, connection errors, then count/sum/last/errors of one HTTP endpoint
+_TELEMETRY = struct.Struct("<BdddIddIBII24sIddI")
+
+SLOT_COUNT = 256
+SLOT_SIZE = 256
+# net -> game slots that MESSAGE records never take, so catch results and
+# telemetry still get through during a message burst
+CONTROL_RESERVE = 8
+# server messages the helper holds while the game is behind; like
+# Dispatcher.max_pending, more than this are dropped and counted
+INBOUND_MAX = 4096
+POLL_INTERVAL = 0.01  # seconds the helper sleeps when both rings are idle
+TELEMETRY_PUSH_INTERVAL = 0.25
+TOKEN_ENV = "GAME_CLIENT_TOKEN"
+
+
+def _opt(value):
+    # None can't be packed as a double; NaN stands in for "no sample yet"
+    return math.nan if value is None else value
+
+
+def _unopt(value):
+    return None if math.isnan(value) else value
+
+
+def encode_state(state):
+    return _STATE.pack(REC_STATE, int(state["x"]), int(state["y"]), int(state["health"]),
+                       state["timestamp"], len(state["inventory"]))
+
+
+def encode_catch(name):
+    return _CATCH.pack(REC_CATCH, name.encode("utf-8")[:32])
+
+
+def encode_telemetry(s):
+    endpoint, http = next(iter(sorted(s["http"].items())), ("", {"count": 0, "sum": 0.0, "last": 0.0, "errors": 0}))
+    return _TELEMETRY.pack(
+        REC_TELEMETRY, _opt(s["rtt_last"]), _opt(s["rtt_avg"]), _opt(s["rtt_max"]), s["ping_timeouts"],
+        s["sent_msgs_per_s"], s["sent_bytes_per_s"], s["queue_depth"], s["connected"], s["reconnects"],
+        s["connection_errors"], endpoint.encode("utf-8")[:24], http["count"], http["sum"], http["last"],
+        http["errors"])
+
+
+def encode_catch_result(ok, quantity):
+    # -1 stands for "no quantity"; so does anything a signed 32-bit field can't hold
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or not 0 <= quantity < 2**31:
+        quantity = -1
+    return _CATCH_RESULT.pack(REC_CATCH_RESULT, bool(ok), quantity)
+
+
+def decode_catch_result(data):
+    """(ok, quantity or None) of a CATCH_RESULT record."""
+    _, ok, quantity = _CATCH_RESULT.unpack(data)
+    return ok, quantity if quantity >= 0 else None
+
+
+def encode_message(message):
+    return bytes([REC_MESSAGE]) + json.dumps(messages.encode(message), separators=(",", ":")).encode("utf-8")
+
+
+def encode_inventory(items, slot_size=SLOT_SIZE):
+    """The INVENTORY records for a whole inventory; always at least one."""
+    limit = slot_size - 2 - 2  # ring length prefix, kind and flag
+    records = []
+    chunk = []
+    for item in items:
+        # same 32-byte cap as CATCH records
+        item = str(item).encode("utf-8")[:32].decode("utf-8", "ignore")
+        if chunk and len(_inventory_json(chunk + [item])) > limit:
+            records.append(chunk)
+            chunk = []
+        chunk.append(item)
+    records.append(chunk)
+    return [bytes([REC_INVENTORY, INV_APPEND if i else INV_REPLACE]) + _inventory_json(chunk)
+            for i, chunk in enumerate(records)]
+
+
+def _inventory_json(items):
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_inventory(data):
+    """(replace, items) of an INVENTORY record."""
+    return data[1] == INV_REPLACE, json.loads(data[2:])
+
+
+def decode_message(data):
+    return messages.decode(json.loads(data[1:]))
+
+
+def decode_telemetry(data):
+    (_, rtt_last, rtt_avg, rtt_max, ping_timeouts, msgs_per_s, bytes_per_s, queue_depth, connected, reconnects,
+     errors, endpoint, count, total, last, http_errors) = _TELEMETRY.unpack(data)
+    endpoint = endpoint.rstrip(b"\0").decode("utf-8", "replace")
+    return {
+        "rtt_last": _unopt(rtt_last),
+        "rtt_avg": _unopt(rtt_avg),
+        "rtt_max": _unopt(rtt_max),
+        "ping_timeouts": ping_timeouts,
+        "sent_msgs_per_s": msgs_per_s,
+        "sent_bytes_per_s": bytes_per_s,
+        "queue_depth": queue_depth,
+        "connected": bool(connected),
+        "reconnects": reconnects,
+        "connection_errors": errors,
+        "http": {endpoint: {"count": count, "sum": total, "last": last, "errors": http_errors}} if endpoint else {},
+    }
+
+
+class NetProcess:
+    """Game-side handle to the networking helper; a drop-in for WebSocketClient."""
+
+    def __init__(self, api_url, ws_url, token=None, telemetry_file=None, log_file=None,
+                 slot_count=SLOT_COUNT, slot_size=SLOT_SIZE, on_message=None):
+        self.api_url = api_url
+        self.ws_url = ws_url
+        self.token = token
+        self.telemetry_file = telemetry_file
+        self.log_file = log_file
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.on_message = on_message
+        self.tx = None
+        self.rx = None
+        self.proc = None
+        self._snapshot = NetTelemetry().snapshot()
+        # inventory as last sent to the helper
+        self._inventory = []
+        self._exited = False
+
+    def start(self):
+        if self.proc and self.proc.poll() is None:
+            return
+        self.tx = ShmRing.create(self.slot_count, self.slot_size)
+        self.rx = ShmRing.create(self.slot_count, self.slot_size)
+        self._inventory = []
+        self._exited = False
+        cmd = [sys.executable, os.path.abspath(__file__), "--tx", self.tx.name, "--rx", self.rx.name,
+               "--slots", str(self.slot_count), "--slot-size", str(self.slot_size), "--watch-stdin",
+               "--api-url", self.api_url, "--ws-url", self.ws_url]
+        if self.telemetry_file:
+            cmd += ["--telemetry-file", self.telemetry_file]
+        if self.log_file:
+            cmd += ["--log-file", self.log_file]
+        env = dict(os.environ)
+        # the token goes through the environment so it doesn't show up in ps
+        if self.token:
+            env[TOKEN_ENV] = self.token
+        # the helper's stdin is a pipe only this process writes to; the OS closes
+        # it when the game exits, however it exits, and the helper stops on EOF
+        self.proc = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE)
+
+    def alive(self):
+        """False once the helper has exited; logs that the first time it's noticed."""
+        if self.proc is None or self._exited:
+            return False
+        code = self.proc.poll()
+        if code is None:
+            return True
+        self._exited = True
+        logger.error("networking helper exited unexpectedly (code %s); the game is offline", code)
+        # drop the last report so the overlay shows disconnected, not stale numbers
+        self._snapshot = NetTelemetry().snapshot()
+        return False
+
+    def send_state(self, state):
+        if self.tx is None or not self.alive():
+            return
+        if state["inventory"] != self._inventory and self._sync_inventory(state["inventory"]):
+            self._inventory = list(state["inventory"])
+        self.tx.push(encode_state(state))
+
+    def _sync_inventory(self, items):
+        for record in encode_inventory(items, self.slot_size):
+            if not self.tx.push(record):
+                # ring full; the helper has a partial list until the retry replaces it
+                return False
+        return True
+
+    def pending(self):
+        """Records the helper hasn't picked up yet."""
+        return len(self.tx) if self.tx is not None else 0
+
+    def catch(self, name):
+        if self.tx is not None and self.alive():
+            self.tx.push(encode_catch(name))
+
+    def poll(self, budget=None):
+        """Read what the helper sent; returns the catch results as (ok, quantity) pairs.
+
+        With a budget, reading stops once budget seconds have passed (after at
+        least one record); the rest stays in the ring for the next call, which
+        also makes the helper hold back further messages.
+        """
+        results = []
+        if self.rx is None:
+            return results
+        # records the helper pushed before it died are still read below
+        self.alive()
+        deadline = None if budget is None else timing.now() + budget
+        while True:
+            data = self.rx.pop()
+            if data is None:
+                break
+            if data[0] == REC_TELEMETRY:
+                self._snapshot = decode_telemetry(data)
+            elif data[0] == REC_CATCH_RESULT:
+                results.append(decode_catch_result(data))
+            elif data[0] == REC_MESSAGE and self.on_message:
+                self.on_message(decode_message(data))
+            if deadline is not None and timing.now() >= deadline:
+                break
+        return results
+
+    def snapshot(self):
+        """Latest telemetry reported by the helper, shaped like NetTelemetry.snapshot()."""
+        s = dict(self._snapshot)
+        s["ring_dropped"] = self.tx.dropped if self.tx is not None else 0
+        return s
+
+    def stop(self, timeout=2.0):
+        if self.proc:
+            self.tx.push(_STOP.pack(REC_STOP))
+            try:
+                self.proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc.stdin.close()
+            self.proc = None
+        for ring in (self.tx, self.rx):
+            if ring is not None:
+                ring.close()
+                ring.unlink()
+        self.tx = self.rx = None
+
+
+# --- helper process side ---
+
+def _catch_worker(jobs, results, token, api_url):
+    while True:
+        name = jobs.get()
+        if name is None:
+            return
+        if not token:
+            log.get("api").info("No token available, skipping pokemon catch submission")
+            continue
+        results.put(net.add_pokemon(token, api_url))
+
+
+def _watch_stdin(gone):
+    # blocks until the game closes its end of the pipe (or dies); a raw read,
+    # so the thread holds no buffer lock that would block interpreter shutdown
+    try:
+        while os.read(sys.stdin.fileno(), 4096):
+            pass
+    except (OSError, ValueError):
+        pass
+    gone.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Game client networking helper")
+    parser.add_argument("--tx", required=True, help="shared memory name of the game -> net ring")
+    parser.add_argument("--rx", required=True, help="shared memory name of the net -> game ring")
+    parser.add_argument("--slots", type=int, default=SLOT_COUNT)
+    parser.add_argument("--slot-size", type=int, default=SLOT_SIZE)
+    parser.add_argument("--watch-stdin", action="store_true",
+                        help="exit when stdin reaches EOF (the game holds the other end of the pipe)")
+    parser.add_argument("--api-url", required=True)
+    parser.add_argument("--ws-url", required=True)
+    parser.add_argument("--telemetry-file")
+    parser.add_argument("--log-file")
+    args = parser.parse_args(argv)
+
+    log.setup(args.log_file)
+
+    tx = ShmRing.attach(args.tx, args.slots, args.slot_size)
+    rx = ShmRing.attach(args.rx, args.slots, args.slot_size)
+    inbound = queue.Queue(INBOUND_MAX)
+    inbound_dropped = [0]
+
+    def on_message(message):
+        # runs on the websocket thread, which must never block on a full queue
+        try:
+            inbound.put_nowait(message)
+        except queue.Full:
+            inbound_dropped[0] += 1
+            logger.warning("inbound queue full, dropped %s message (%d so far)",
+                           type(message).__name__, inbound_dropped[0])
+
+    ws_client = net.WebSocketClient(args.ws_url, on_message=on_message)
+    ws_client.start()
+    exporter = None
+    if args.telemetry_file:
+        exporter = PrometheusExporter(telemetry, args.telemetry_file)
+        exporter.start()
+    jobs = queue.Queue()
+    results = queue.Queue()
+    worker = threading.Thread(target=_catch_worker, args=(jobs, results, os.environ.get(TOKEN_ENV), args.api_url),
+                              daemon=True)
+    worker.start()
+    parent_gone = threading.Event()
+    if args.watch_stdin:
+        threading.Thread(target=_watch_stdin, args=(parent_gone,), daemon=True).start()
+    logger.info("networking helper started (pid %d)", os.getpid())
+
+    inventory = []
+    message_slots = rx.slot_count - min(CONTROL_RESERVE, rx.slot_count // 2)
+    # catch results the game hasn't been able to take yet
+    unsent_results = collections.deque()
+    next_telemetry = 0.0
+    running = True
+    while running:
+        records = tx.drain()
+        for data in records:
+            kind = data[0]
+            if kind == REC_STATE:
+                _, x, y, health, timestamp, count = _STATE.unpack(data)
+                ws_client.send_state({"x": x, "y": y, "health": health, "inventory": inventory[:count],
+                                      "timestamp": timestamp})
+            elif kind == REC_CATCH:
+                # the inventory itself arrives as INVENTORY records
+                jobs.put(_CATCH.unpack(data)[1].rstrip(b"\0").decode("utf-8", "replace"))
+            elif kind == REC_INVENTORY:
+                replace, items = decode_inventory(data)
+                if replace:
+                    inventory = []
+                inventory += items
+            elif kind == REC_STOP:
+                running = False
+        # only this thread writes to rx, keeping the ring single-producer.
+        # Control records go first and are kept until the ring takes them.
+        while not results.empty():
+            unsent_results.append(results.get_nowait())
+        while unsent_results:
+            if not rx.push(encode_catch_result(*unsent_results[0])):
+                break
+            unsent_results.popleft()
+        now = time.monotonic()
+        # a telemetry record that didn't fit is retried with a fresh snapshot
+        if now >= next_telemetry and rx.push(encode_telemetry(telemetry.snapshot())):
+            next_telemetry = now + TELEMETRY_PUSH_INTERVAL
+        # messages stop short of the reserved slots; while the ring is that
+        # full they wait in the inbound queue instead of being dropped
+        while len(rx) < message_slots and not inbound.empty():
+            message = inbound.get_nowait()
+            try:
+                rx.push(encode_message(message))
+            except ValueError as e:
+                logger.warning("dropped %s message: %s", type(message).__name__, e)
+        # EOF on stdin without a STOP means the game died
+        if running and parent_gone.is_set():
+            logger.warning("game process exited, stopping")
+            running = False
+        if running and not records:
+            time.sleep(POLL_INTERVAL)
+
+    jobs.put(None)
+    ws_client.stop()
+    if exporter:
+        exporter.stop()
+    tx.close()
+    rx.close()
+    logger.info("networking helper stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Adaptive frame pacing for the game loop.
+
+Runs at the configured frame cap while something is happening, drops to a
+low rate when the scene is static, and sleeps in pygame.event.wait() while
+the window is minimised or unfocused so input still wakes the loop at once.
+All sleeping goes through timing.InputTimer so input events are timestamped
+on arrival.
+"""
+import collections
+import time
+
+import pygame
+
+import timing
+
+ACTIVE = "active"
+IDLE = "idle"
+INACTIVE = "inactive"
+
+FPS_CAPS = (30, 60, 120, 0)  # 0 = uncapped
+# longest dt tick() returns; see FramePacer.tick
+MAX_DT = 0.1
+
+
+class FramePacer:
+    def __init__(self, fps_cap=60, idle_fps=10, inactive_fps=4, idle_grace=0.5,
+                 throttle=True, max_dt=MAX_DT, stats_frames=120, input_timer=None):
+        self.clock = pygame.time.Clock()
+        self.input = input_timer or timing.InputTimer()
+        self.fps_cap = fps_cap
+        self.idle_fps = idle_fps
+        self.inactive_fps = inactive_fps
+        # how long the scene must stay static before throttling
+        self.idle_grace = idle_grace
+        # when False always run at the frame cap (benchmarks, capture tools)
+        self.throttle = throttle
+        # cap dt so a long sleep doesn't teleport anything on wake-up
+        self.max_dt = max_dt
+        # unclamped duration of the last frame
+        self.raw_dt = 0.0
+        self.mode = ACTIVE
+        self._last_busy = time.perf_counter()
+        self._cpu_last = time.process_time()
+        self._wall_last = time.perf_counter()
+        self._frame_start = timing.now()
+        self._cpu = collections.deque(maxlen=stats_frames)
+        self._wall = collections.deque(maxlen=stats_frames)
+        self.frames = 0
+        self.cpu_total = 0.0
+
+    def choose_mode(self, busy, window_active, now=None):
+        now = time.perf_counter() if now is None else now
+        if busy:
+            self._last_busy = now
+        if not self.throttle:
+            return ACTIVE
+        if not window_active:
+            return INACTIVE
+        if now - self._last_busy > self.idle_grace:
+            return IDLE
+        return ACTIVE
+
+    def tick(self, busy, wake_in=None):
+        """Wait until the next frame is due and return dt in seconds.
+
+        busy: something moved, animated or received input this frame.
+        wake_in: seconds until the next scheduled game event (respawn, popup expiry).
+
+        dt is capped at max_dt on purpose: after a stall (window drag,
+        breakpoint, slow disk) movement and animations advance by at most one
+        max_dt step instead of jumping. Timers are not affected, since respawns
+        and popups are scheduled against timing.now(), not summed dt. The
+        unclamped value is kept in raw_dt.
+        """
+        window_active = pygame.display.get_active() and pygame.key.get_focused()
+        self.mode = self.choose_mode(busy, window_active)
+
+        if self.mode == ACTIVE:
+            if self.fps_cap:
+                self.input.wait_until(self._frame_start + 1.0 / self.fps_cap)
+        else:
+            timeout = 1.0 / (self.idle_fps if self.mode == IDLE else self.inactive_fps)
+            if wake_in is not None:
+                timeout = min(timeout, max(0.0, wake_in))
+            self.input.wait_until(timing.now() + timeout, wake_on_event=True)
+        self._frame_start = timing.now()
+        ms = self.clock.tick()
+
+        self._sample()
+        self.raw_dt = ms / 1000.0
+        return min(self.raw_dt, self.max_dt)
+
+    def _sample(self):
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        self._cpu.append(cpu - self._cpu_last)
+        self._wall.append(wall - self._wall_last)
+        self.cpu_total += cpu - self._cpu_last
+        self._cpu_last = cpu
+        self._wall_last = wall
+        self.frames += 1
+
+    def stats(self):
+        """Recent averages: fps, wall ms per frame and process CPU ms per frame."""
+        n = len(self._wall)
+        if n == 0:
+            return {"mode": self.mode, "fps": 0.0, "frame_ms": 0.0, "cpu_ms": 0.0}
+        wall = sum(self._wall)
+        return {
+            "mode": self.mode,
+            "fps": n / wall if wall > 0 else 0.0,
+            "frame_ms": wall / n * 1000,
+            "cpu_ms": sum(self._cpu) / n * 1000,
+        }
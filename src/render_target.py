@@ -0,0 +1,82 @@
+"""Fixed logical render resolution with a single scaled present.
+
+The game draws into an offscreen surface of a fixed logical size; present()
+scales it into the (resizable) window once per frame, letterboxed to keep the
+aspect ratio. Layout, collision and the generated grass only ever see the
+logical size, so resizing the window just changes the final scale.
+"""
+import pygame
+
+
+def parse_size(text):
+    """Parse "640x360" into (640, 360)."""
+    w, sep, h = text.lower().partition("x")
+    if not sep:
+        raise ValueError(f"expected WIDTHxHEIGHT, got {text!r}")
+    size = (int(w), int(h))
+    if size[0] <= 0 or size[1] <= 0:
+        raise ValueError(f"size must be positive, got {text!r}")
+    return size
+
+
+class RenderTarget:
+    def __init__(self, logical_size, window_size, smooth=False):
+        self.logical_size = logical_size
+        self.smooth = smooth
+        self.window = pygame.display.set_mode(window_size, pygame.RESIZABLE)
+        self.surface = pygame.Surface(logical_size).convert()
+        self._window_size = None
+        self._dest = None
+        self._target = None
+
+    def _layout(self):
+        # the display surface can be replaced by pygame when the window is resized
+        window = pygame.display.get_surface()
+        size = window.get_size()
+        if window is self.window and size == self._window_size:
+            return
+        self.window = window
+        self._window_size = size
+        if size[0] <= 0 or size[1] <= 0:
+            # minimised: nothing to draw into until the window has an area again
+            self._dest = self._target = None
+            return
+        lw, lh = self.logical_size
+        scale = min(size[0] / lw, size[1] / lh)
+        w, h = max(1, int(lw * scale)), max(1, int(lh * scale))
+        self._dest = pygame.Rect((size[0] - w) // 2, (size[1] - h) // 2, w, h)
+        self._target = window.subsurface(self._dest)
+
+    def to_logical(self, pos):
+        """Map a window pixel position to logical coordinates."""
+        self._layout()
+        d = self._dest
+        if d is None:
+            return (0, 0)
+        x = (pos[0] - d.x) * self.logical_size[0] / d.width
+        y = (pos[1] - d.y) * self.logical_size[1] / d.height
+        return (int(x), int(y))
+
+    def map_event(self, event):
+        """Return event with any mouse position converted to logical coordinates."""
+        if not hasattr(event, "pos"):
+            return event
+        attrs = dict(event.__dict__)
+        attrs["pos"] = self.to_logical(event.pos)
+        return pygame.event.Event(event.type, attrs)
+
+    def present(self):
+        """Scale the logical surface into the window; call once per frame before flip()."""
+        self._layout()
+        if self._target is None:
+            return
+        if self._dest.size != self._window_size:
+            self.window.fill((0, 0, 0))
+        # scale straight into the window area, no intermediate surface
+        target = self._target
+        if self._dest.size == self.logical_size:
+            target.blit(self.surface, (0, 0))
+        elif self.smooth:
+            pygame.transform.smoothscale(self.surface, self._dest.size, target)
+        else:
+            pygame.transform.scale(self.surface, self._dest.size, target)
@@ -0,0 +1,186 @@
+"""Deterministic record-and-replay of game sessions.
+
+A session log is a gzip-compressed binary stream:
+
+    header   b"PKRP" | version u8 | rng seed u64 | wall clock offset f64 | logical w,h u16
+             | enemy slots u16
+    frame    b"F" | now f64 | dt f64 | key mask u16 | mouse x,y i16 | n events u8
+             followed by n events: kind u8 | time f64 | key u32 | button u8 | x,y i16
+    message  b"M" | kind u8 | length u32 | utf-8 json
+    inbound  b"I" | length u32 | utf-8 json
+    end      b"E"
+
+Times are timing.now() readings; adding the wall clock offset gives epoch
+seconds. Positions are in logical render coordinates. Messages are the outgoing network traffic produced while handling the frame
+before them, so a replay can check that it produces the same messages.
+Inbound records are the server messages the game handled during the frame
+before them; a replay feeds them back instead of connecting to the server.
+"""
+import collections
+import gzip
+import json
+import struct
+
+MAGIC = b"PKRP"
+VERSION = 5
+
+_HEADER = struct.Struct("<4sBQdHHH")
+_FRAME = struct.Struct("<ddHhhB")
+_EVENT = struct.Struct("<BdIBhh")
+_MESSAGE = struct.Struct("<BI")
+_INBOUND = struct.Struct("<I")
+
+# event kinds
+EV_QUIT = 1
+EV_KEYDOWN = 2
+EV_MOUSEDOWN = 3
+
+# message kinds
+MSG_STATE = 1
+MSG_CATCH = 2
+
+Event = collections.namedtuple("Event", "kind time key button x y")
+Frame = collections.namedtuple("Frame", "now dt keymask mouse events messages inbound")
+
+
+class ReplayError(Exception):
+    pass
+
+
+def key_mask(pressed, tracked):
+    """Pack the pressed state of the tracked keys into a bit mask."""
+    mask = 0
+    for i, k in enumerate(tracked):
+        if pressed[k]:
+            mask |= 1 << i
+    return mask
+
+
+class KeyMask:
+    """Read-only stand-in for pygame.key.get_pressed() built from a key mask."""
+
+    def __init__(self, mask, tracked):
+        self._pressed = {k for i, k in enumerate(tracked) if mask & (1 << i)}
+
+    def __getitem__(self, key):
+        return key in self._pressed
+
+
+def _encode_message(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class Recorder:
+    """Writes frames, outgoing and handled inbound messages of a live session to a log file."""
+
+    def __init__(self, path, seed, wall_offset=0.0, size=(0, 0), enemies=1):
+        self.path = path
+        self.seed = seed
+        self._f = gzip.open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, seed, wall_offset, size[0], size[1], enemies))
+        self.frames = 0
+
+    def frame(self, now, dt, keymask, mouse, events):
+        events = events[:255]
+        self._f.write(b"F" + _FRAME.pack(now, dt, keymask, mouse[0], mouse[1], len(events)))
+        for ev in events:
+            self._f.write(_EVENT.pack(ev.kind, ev.time, ev.key, ev.button, ev.x, ev.y))
+        self.frames += 1
+
+    def message(self, kind, payload):
+        data = _encode_message(payload)
+        self._f.write(b"M" + _MESSAGE.pack(kind, len(data)) + data)
+
+    def inbound(self, payload):
+        data = _encode_message(payload)
+        self._f.write(b"I" + _INBOUND.pack(len(data)) + data)
+
+    def close(self):
+        if self._f:
+            self._f.write(b"E")
+            self._f.close()
+            self._f = None
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise ReplayError("truncated session log")
+    return data
+
+
+def read_session(path):
+    """Load a session log and return (seed, wall_offset, size, enemies, frames)."""
+    frames = []
+    with gzip.open(path, "rb") as f:
+        magic, version, seed, wall_offset, w, h, enemies = _HEADER.unpack(_read_exact(f, _HEADER.size))
+        if magic != MAGIC:
+            raise ReplayError(f"{path} is not a session log")
+        if version != VERSION:
+            raise ReplayError(f"unsupported session log version {version}")
+        while True:
+            tag = f.read(1)
+            if tag in (b"", b"E"):
+                # a missing end marker means the game was killed; keep what we have
+                break
+            if tag == b"F":
+                now, dt, mask, mx, my, n = _FRAME.unpack(_read_exact(f, _FRAME.size))
+                events = [Event(*_EVENT.unpack(_read_exact(f, _EVENT.size))) for _ in range(n)]
+                frames.append(Frame(now, dt, mask, (mx, my), events, [], []))
+            elif tag == b"M":
+                kind, length = _MESSAGE.unpack(_read_exact(f, _MESSAGE.size))
+                payload = json.loads(_read_exact(f, length).decode("utf-8"))
+                if not frames:
+                    raise ReplayError("message before first frame")
+                frames[-1].messages.append((kind, payload))
+            elif tag == b"I":
+                (length,) = _INBOUND.unpack(_read_exact(f, _INBOUND.size))
+                payload = json.loads(_read_exact(f, length).decode("utf-8"))
+                if not frames:
+                    raise ReplayError("inbound message before first frame")
+                frames[-1].inbound.append(payload)
+            else:
+                raise ReplayError(f"unknown record tag {tag!r}")
+    return seed, wall_offset, (w, h), enemies, frames
+
+
+class Replayer:
+    """Feeds recorded frames back to the game loop and checks its messages."""
+
+    def __init__(self, path):
+        self.path = path
+        self.seed, self.wall_offset, self.size, self.enemies, self.frames = read_session(path)
+        self.index = -1
+        self.mismatches = 0
+        self._expected = collections.deque()
+
+    @property
+    def done(self):
+        return self.index + 1 >= len(self.frames)
+
+    @property
+    def duration(self):
+        if not self.frames:
+            return 0.0
+        return self.frames[-1].now - self.frames[0].now
+
+    def next_frame(self):
+        # anything the previous frame should have sent but didn't is a mismatch
+        self.mismatches += len(self._expected)
+        self.index += 1
+        frame = self.frames[self.index]
+        self._expected = collections.deque(frame.messages)
+        return frame
+
+    def message(self, kind, payload):
+        """Compare an outgoing message with the recording; returns True on match."""
+        if self._expected:
+            exp_kind, exp_payload = self._expected.popleft()
+            if exp_kind == kind and _encode_message(exp_payload) == _encode_message(payload):
+                return True
+        self.mismatches += 1
+        return False
+
+    def finish(self):
+        self.mismatches += len(self._expected)
+        self._expected.clear()
@@ -0,0 +1,121 @@
+"""Single-producer, single-consumer ring buffer in shared memory.
+
+Used to pass fixed-layout records between the game and the networking helper
+process (see netproc.py) without pickling, pipes or locks. Each ring has one
+writer and one reader: the writer only moves the head index and the reader only
+moves the tail index, so neither side ever waits on the other. A full ring
+drops the new record and counts it instead of blocking the writer.
+
+Layout of the shared block:
+
+    0    head (u64)   records written so far
+    64   tail (u64)   records read so far
+    128  slots        slot_count * slot_size bytes, each "<H" length + payload
+
+head and tail sit on separate cache lines so the two processes don't keep
+invalidating each other's line.
+"""
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+_INDEX = struct.Struct("<Q")
+_LEN = struct.Struct("<H")
+HEAD_OFFSET = 0
+TAIL_OFFSET = 64
+SLOTS_OFFSET = 128
+
+
+class ShmRing:
+    """Fixed-size slot ring over a multiprocessing.shared_memory block."""
+
+    def __init__(self, shm, slot_count, slot_size, owner):
+        self.shm = shm
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.owner = owner
+        self.dropped = 0
+        self._buf = shm.buf
+
+    @classmethod
+    def create(cls, slot_count=256, slot_size=128, name=None):
+        """Create a new ring; the creator is responsible for unlink()."""
+        if slot_count <= 0 or slot_size <= _LEN.size:
+            raise ValueError("slot_count and slot_size must be positive")
+        size = SLOTS_OFFSET + slot_count * slot_size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:SLOTS_OFFSET] = bytes(SLOTS_OFFSET)
+        return cls(shm, slot_count, slot_size, owner=True)
+
+    @classmethod
+    def attach(cls, name, slot_count=256, slot_size=128):
+        """Attach to a ring created by another process."""
+        shm = shared_memory.SharedMemory(name=name)
+        # only the creating process may unlink the block; without this the
+        # attaching process' resource tracker would remove it when it exits
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, slot_count, slot_size, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _get(self, offset):
+        return _INDEX.unpack_from(self._buf, offset)[0]
+
+    def _set(self, offset, value):
+        _INDEX.pack_into(self._buf, offset, value)
+
+    def __len__(self):
+        return self._get(HEAD_OFFSET) - self._get(TAIL_OFFSET)
+
+    def push(self, data):
+        """Append one record; returns False (and counts a drop) if the ring is full."""
+        if len(data) > self.slot_size - _LEN.size:
+            raise ValueError(f"record of {len(data)} bytes does not fit a {self.slot_size} byte slot")
+        head = self._get(HEAD_OFFSET)
+        if head - self._get(TAIL_OFFSET) >= self.slot_count:
+            self.dropped += 1
+            return False
+        offset = SLOTS_OFFSET + (head % self.slot_count) * self.slot_size
+        _LEN.pack_into(self._buf, offset, len(data))
+        self._buf[offset + _LEN.size:offset + _LEN.size + len(data)] = data
+        # publish only after the slot is fully written
+        self._set(HEAD_OFFSET, head + 1)
+        return True
+
+    def pop(self):
+        """Remove and return the oldest record, or None if the ring is empty."""
+        tail = self._get(TAIL_OFFSET)
+        if tail == self._get(HEAD_OFFSET):
+            return None
+        offset = SLOTS_OFFSET + (tail % self.slot_count) * self.slot_size
+        n = _LEN.unpack_from(self._buf, offset)[0]
+        data = bytes(self._buf[offset + _LEN.size:offset + _LEN.size + n])
+        self._set(TAIL_OFFSET, tail + 1)
+        return data
+
+    def drain(self, limit=None):
+        """Pop up to limit records (all pending ones by default)."""
+        out = []
+        while limit is None or len(out) < limit:
+            data = self.pop()
+            if data is None:
+                break
+            out.append(data)
+        return out
+
+    def close(self):
+        self._buf = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,313 @@
+"""Enemy spawning for maps with many spawn slots.
+
+Spawn points are precomputed once per area as a Poisson-disk set, so any two
+points are at least min_dist apart and enemies never overlap. Free points and
+live enemies are kept in uniform grids, so "a free point away from the player"
+and "enemies near the player" only look at the grid cells around the player
+instead of every point. Respawns wait in a min-heap keyed by due time, so each
+frame only looks at the earliest one. The per-spawn cost therefore doesn't grow
+with the number of slots.
+
+All randomness comes from the rng passed in (the seeded random module in the
+game), so spawns are the same when a session is replayed.
+"""
+import heapq
+import math
+
+# random picks per spawn before giving up and retrying on a later frame
+PICK_ATTEMPTS = 32
+
+
+def poisson_disk(area, min_dist, rng, k=30):
+    """Points inside area (x, y, w, h) at least min_dist apart (Bridson's algorithm)."""
+    x0, y0, w, h = area
+    if w <= 0 or h <= 0:
+        return []
+    cell = min_dist / math.sqrt(2)
+    cols = max(1, int(math.ceil(w / cell)))
+    rows = max(1, int(math.ceil(h / cell)))
+    grid = [None] * (cols * rows)
+    points = []
+    active = []
+
+    def cell_of(x, y):
+        return min(cols - 1, int((x - x0) / cell)), min(rows - 1, int((y - y0) / cell))
+
+    def fits(x, y):
+        cx, cy = cell_of(x, y)
+        for gy in range(max(0, cy - 2), min(rows, cy + 3)):
+            for gx in range(max(0, cx - 2), min(cols, cx + 3)):
+                p = grid[gy * cols + gx]
+                if p is not None and (p[0] - x) ** 2 + (p[1] - y) ** 2 < min_dist * min_dist:
+                    return False
+        return True
+
+    def add(x, y):
+        cx, cy = cell_of(x, y)
+        grid[cy * cols + cx] = (x, y)
+        points.append((x, y))
+        active.append((x, y))
+
+    add(x0 + rng.random() * w, y0 + rng.random() * h)
+    while active:
+        i = rng.randrange(len(active))
+        px, py = active[i]
+        for _ in range(k):
+            angle = rng.random() * 2 * math.pi
+            r = min_dist * (1 + rng.random())
+            x = px + r * math.cos(angle)
+            y = py + r * math.sin(angle)
+            if x0 <= x < x0 + w and y0 <= y < y0 + h and fits(x, y):
+                add(x, y)
+                break
+        else:
+            # no room left around this point
+            active[i] = active[-1]
+            active.pop()
+    return points
+
+
+class SpatialGrid:
+    """Uniform grid of keyed positions for radius queries."""
+
+    def __init__(self, cell):
+        self.cell = cell
+        self._cells = {}
+        self._pos = {}
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def keys(self):
+        return self._pos.keys()
+
+    def _cell(self, pos):
+        return int(pos[0] // self.cell), int(pos[1] // self.cell)
+
+    def insert(self, key, pos):
+        self.remove(key)
+        self._pos[key] = pos
+        self._cells.setdefault(self._cell(pos), set()).add(key)
+
+    def remove(self, key):
+        pos = self._pos.pop(key, None)
+        if pos is None:
+            return
+        cell = self._cell(pos)
+        keys = self._cells[cell]
+        keys.discard(key)
+        if not keys:
+            del self._cells[cell]
+
+    def query(self, pos, radius):
+        """Keys within radius of pos, in key order."""
+        cx0, cy0 = self._cell((pos[0] - radius, pos[1] - radius))
+        cx1, cy1 = self._cell((pos[0] + radius, pos[1] + radius))
+        r2 = radius * radius
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                for key in self._cells.get((cx, cy), ()):
+                    p = self._pos[key]
+                    if (p[0] - pos[0]) ** 2 + (p[1] - pos[1]) ** 2 <= r2:
+                        found.append(key)
+        # sorted so callers see the same order on replay
+        found.sort()
+        return found
+
+
+class SpawnScheduler:
+    """Min-heap of pending respawns; cancelled entries are skipped lazily."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = 0
+        self._due = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, slot, due):
+        self._seq += 1
+        self._due[slot] = (due, self._seq)
+        heapq.heappush(self._heap, (due, self._seq, slot))
+
+    def cancel(self, slot):
+        self._due.pop(slot, None)
+
+    def _skip_stale(self):
+        while self._heap:
+            due, seq, slot = self._heap[0]
+            if self._due.get(slot) == (due, seq):
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        self._skip_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the slots whose time has come, earliest first."""
+        slots = []
+        while True:
+            self._skip_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return slots
+            _, _, slot = heapq.heappop(self._heap)
+            del self._due[slot]
+            slots.append(slot)
+
+
+class Slot:
+    """One enemy spawn slot; pos and name are set while it's alive."""
+
+    def __init__(self, index):
+        self.index = index
+        self.alive = False
+        self.pos = None
+        self.point = None
+        self.name = None
+
+
+class Spawner:
+    def __init__(self, areas, min_dist, slots, rng, safe_dist=0.0, respawn=(3.0, 7.0), retry=0.5):
+        self.rng = rng
+        self.min_dist = min_dist
+        self.safe_dist = safe_dist
+        self.respawn = respawn
+        self.retry = retry
+        self.points = []
+        for area in areas:
+            self.points += poisson_disk(area, min_dist, rng)
+        # free points: a list for O(1) random picks plus a grid for radius queries
+        self._free = list(range(len(self.points)))
+        self._free_index = {p: i for i, p in enumerate(self._free)}
+        self._free_grid = SpatialGrid(max(min_dist, 1.0))
+        for i, p in enumerate(self.points):
+            self._free_grid.insert(i, p)
+        self._alive = SpatialGrid(max(min_dist, 1.0))
+        self.slots = [Slot(i) for i in range(slots)]
+        self.scheduler = SpawnScheduler()
+
+    # --- free point bookkeeping ---
+    def _take_point(self, point):
+        i = self._free_index.pop(point)
+        last = self._free.pop()
+        if last != point:
+            self._free[i] = last
+            self._free_index[last] = i
+        self._free_grid.remove(point)
+
+    def _release_point(self, point):
+        self._free_index[point] = len(self._free)
+        self._free.append(point)
+        self._free_grid.insert(point, self.points[point])
+
+    def _pick_point(self, avoid):
+        """A random free point farther than safe_dist from avoid, or None.
+
+        Gives up after PICK_ATTEMPTS random picks; the caller then defers the
+        spawn, so a free list crowded around the player never stalls a frame.
+        """
+        if not self._free:
+            return None
+        near = set(self._free_grid.query(avoid, self.safe_dist)) if avoid is not None and self.safe_dist else set()
+        if len(near) >= len(self._free):
+            return None
+        for _ in range(PICK_ATTEMPTS):
+            point = self._free[self.rng.randrange(len(self._free))]
+            if point not in near:
+                return point
+        return None
+
+    # --- slots ---
+    def spawn(self, slot, avoid=None):
+        """Bring a dead slot to life at a free point; returns False if none is available."""
+        if slot.alive:
+            return True
+        point = self._pick_point(avoid)
+        if point is None:
+            return False
+        self._take_point(point)
+        self._set_alive(slot, self.points[point], point, None)
+        return True
+
+    def spawn_all(self, now, avoid=None):
+        full = False
+        for slot in self.slots:
+            if slot.alive:
+                continue
+            # once one slot finds no point, the rest won't either
+            if full or not self.spawn(slot, avoid):
+                full = True
+                self.scheduler.schedule(slot.index, now + self.retry)
+
+    def place(self, pos, name=None, keep=None):
+        """Put an enemy at an exact position (e.g. pushed by the server).
+
+        Uses the first dead slot; when every slot is alive, the first slot
+        other than keep (e.g. the one being caught) is moved instead. Returns
+        None if there is no such slot.
+        """
+        slot = next((slot for slot in self.slots if not slot.alive), None)
+        if slot is None:
+            slot = next((slot for slot in self.slots if slot is not keep), None)
+            if slot is None:
+                return None
+            self._kill(slot)
+        self.scheduler.cancel(slot.index)
+        self._set_alive(slot, pos, None, name)
+        return slot
+
+    def _set_alive(self, slot, pos, point, name):
+        slot.alive = True
+        slot.pos = pos
+        slot.point = point
+        slot.name = name
+        self._alive.insert(slot.index, pos)
+
+    def _kill(self, slot):
+        slot.alive = False
+        self._alive.remove(slot.index)
+        if slot.point is not None:
+            self._release_point(slot.point)
+        slot.pos = slot.point = slot.name = None
+
+    def despawn(self, slot, now):
+        """Remove a live enemy and schedule its respawn."""
+        if not slot.alive:
+            return
+        self._kill(slot)
+        self.scheduler.schedule(slot.index, now + self.rng.uniform(*self.respawn))
+
+    def update(self, now, avoid=None):
+        """Spawn every slot whose respawn is due; returns the slots that came alive."""
+        spawned = []
+        full = False
+        for index in self.scheduler.pop_due(now):
+            slot = self.slots[index]
+            if not full and self.spawn(slot, avoid):
+                spawned.append(slot)
+            else:
+                # everything free is taken or too close to the player; try again shortly
+                full = True
+                self.scheduler.schedule(index, now + self.retry)
+        return spawned
+
+    def next_due(self):
+        return self.scheduler.next_due()
+
+    def near(self, pos, radius):
+        """Live slots within radius of pos."""
+        return [self.slots[i] for i in self._alive.query(pos, radius)]
+
+    def alive(self):
+        """Live slots in slot order."""
+        return [self.slots[i] for i in sorted(self._alive.keys())]
+
+    def stats(self):
+        return {"slots": len(self.slots), "alive": len(self._alive), "pending": len(self.scheduler),
+                "points": len(self.points), "free_points": len(self._free)}
@@ -0,0 +1,216 @@
+"""Network telemetry for the game client.
+
+Tracks websocket RTT, send throughput, send-queue depth, reconnects and
+per-endpoint HTTP latency. Values can be read with snapshot() for the debug
+overlay, and PrometheusExporter writes them to a text-format file that the
+node exporter textfile collector can scrape.
+"""
+import collections
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("client.telemetry")
+
+
+class RateCounter:
+    """Counts events and amounts over a sliding time window."""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self.total = 0
+        self._samples = collections.deque()
+
+    def add(self, amount=1, now=None):
+        now = time.monotonic() if now is None else now
+        self.total += amount
+        self._samples.append((now, amount))
+        self._trim(now)
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        return sum(a for _, a in self._samples) / self.window
+
+    def _trim(self, now):
+        cutoff = now - self.window
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+
+class NetTelemetry:
+    """Thread-safe store of network metrics shared by the ws and HTTP code."""
+
+    def __init__(self, window=5.0):
+        self._lock = threading.Lock()
+        self.window = window
+        self.sent_bytes = RateCounter(window)
+        self.sent_msgs = RateCounter(window)
+        self.recv_bytes = RateCounter(window)
+        self.recv_msgs = RateCounter(window)
+        self.rtt_last = None
+        self.rtt_samples = collections.deque(maxlen=32)
+        self.ping_timeouts = 0
+        self.queue_depth = 0
+        self.connected = False
+        self.connects = 0
+        self.reconnects = 0
+        self.connection_errors = 0
+        # endpoint -> {"count", "sum", "last", "errors"}
+        self.http = {}
+
+    # --- recording (called from the network thread / API calls) ---
+    def record_send(self, nbytes):
+        with self._lock:
+            self.sent_bytes.add(nbytes)
+            self.sent_msgs.add(1)
+
+    def record_recv(self, nbytes):
+        with self._lock:
+            self.recv_bytes.add(nbytes)
+            self.recv_msgs.add(1)
+
+    def record_rtt(self, seconds):
+        with self._lock:
+            self.rtt_last = seconds
+            self.rtt_samples.append(seconds)
+
+    def record_ping_timeout(self):
+        with self._lock:
+            self.ping_timeouts += 1
+
+    def set_queue_depth(self, depth):
+        self.queue_depth = depth
+
+    def record_connected(self):
+        with self._lock:
+            if self.connects > 0:
+                self.reconnects += 1
+            self.connects += 1
+            self.connected = True
+
+    def record_disconnected(self, error=False):
+        with self._lock:
+            self.connected = False
+            if error:
+                self.connection_errors += 1
+
+    def record_http(self, endpoint, seconds, status):
+        """Record one HTTP call; status is the response code or None on failure."""
+        with self._lock:
+            ep = self.http.setdefault(endpoint, {"count": 0, "sum": 0.0, "last": 0.0, "errors": 0})
+            ep["count"] += 1
+            ep["sum"] += seconds
+            ep["last"] = seconds
+            if status is None or status >= 400:
+                ep["errors"] += 1
+
+    # --- reading ---
+    def snapshot(self):
+        with self._lock:
+            rtts = list(self.rtt_samples)
+            return {
+                "rtt_last": self.rtt_last,
+                "rtt_avg": sum(rtts) / len(rtts) if rtts else None,
+                "rtt_max": max(rtts) if rtts else None,
+                "ping_timeouts": self.ping_timeouts,
+                "sent_bytes_total": self.sent_bytes.total,
+                "sent_msgs_total": self.sent_msgs.total,
+                "sent_bytes_per_s": self.sent_bytes.rate(),
+                "sent_msgs_per_s": self.sent_msgs.rate(),
+                "recv_bytes_total": self.recv_bytes.total,
+                "recv_msgs_total": self.recv_msgs.total,
+                "recv_bytes_per_s": self.recv_bytes.rate(),
+                "recv_msgs_per_s": self.recv_msgs.rate(),
+                "queue_depth": self.queue_depth,
+                "connected": self.connected,
+                "reconnects": self.reconnects,
+                "connection_errors": self.connection_errors,
+                "http": {k: dict(v) for k, v in self.http.items()},
+            }
+
+    def to_prometheus(self, prefix="game_client"):
+        """Render the current metrics in the Prometheus text exposition format."""
+        s = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            full = f"{prefix}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{full}{labels} {float(value):g}")
+
+        metric("ws_rtt_seconds", "gauge", "Last websocket ping round-trip time.", [("", s["rtt_last"])])
+        metric("ws_rtt_avg_seconds", "gauge", "Average of recent websocket round-trip times.", [("", s["rtt_avg"])])
+        metric("ws_rtt_max_seconds", "gauge", "Maximum of recent websocket round-trip times.", [("", s["rtt_max"])])
+        metric("ws_ping_timeouts_total", "counter", "Websocket pings that got no pong in time.", [("", s["ping_timeouts"])])
+        metric("ws_sent_bytes_total", "counter", "Bytes sent over the websocket.", [("", s["sent_bytes_total"])])
+        metric("ws_sent_messages_total", "counter", "Messages sent over the websocket.", [("", s["sent_msgs_total"])])
+        metric("ws_sent_bytes_per_second", "gauge", "Recent websocket send rate in bytes.", [("", s["sent_bytes_per_s"])])
+        metric("ws_sent_messages_per_second", "gauge", "Recent websocket send rate in messages.", [("", s["sent_msgs_per_s"])])
+        metric("ws_received_bytes_total", "counter", "Bytes received over the websocket.", [("", s["recv_bytes_total"])])
+        metric("ws_received_messages_total", "counter", "Messages received over the websocket.", [("", s["recv_msgs_total"])])
+        metric("ws_send_queue_depth", "gauge", "Messages waiting in the websocket send queue.", [("", s["queue_depth"])])
+        metric("ws_connected", "gauge", "1 if the websocket is currently connected.", [("", 1 if s["connected"] else 0)])
+        metric("ws_reconnects_total", "counter", "Websocket reconnects after the first connect.", [("", s["reconnects"])])
+        metric("ws_connection_errors_total", "counter", "Websocket connections that failed or dropped.", [("", s["connection_errors"])])
+
+        endpoints = sorted(s["http"].items())
+        # a summary without quantiles: one _sum and one _count series per endpoint
+        metric("http_request_duration_seconds", "summary", "HTTP request duration per endpoint.", [])
+        for ep, v in endpoints:
+            full = f"{prefix}_http_request_duration_seconds"
+            lines.append(f'{full}_sum{{endpoint="{ep}"}} {float(v["sum"]):g}')
+            lines.append(f'{full}_count{{endpoint="{ep}"}} {float(v["count"]):g}')
+        metric("http_request_last_seconds", "gauge", "Duration of the last HTTP request per endpoint.",
+               [(f'{{endpoint="{ep}"}}', v["last"]) for ep, v in endpoints])
+        metric("http_request_errors_total", "counter", "HTTP requests that failed or returned >= 400.",
+               [(f'{{endpoint="{ep}"}}', v["errors"]) for ep, v in endpoints])
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    """Background thread that periodically writes telemetry to a .prom file."""
+
+    def __init__(self, telemetry, path, interval=10.0):
+        self.telemetry = telemetry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        # final write so the file reflects the end of the session
+        self.write()
+
+    def write(self):
+        # write to a temp file and rename so the collector never reads a partial file
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(self.telemetry.to_prometheus())
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning("failed to write %s: %s", self.path, e)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+
+# shared instance used by the client networking code
+telemetry = NetTelemetry()
@@ -0,0 +1,56 @@
+import pygame
+
+from animation import Animation, AnimationPlayer, SpriteCache, idle_animation, split_strip, surface_bytes
+
+
+def _sprite(w=10, h=10):
+    return pygame.Surface((w, h), pygame.SRCALPHA, 32)
+
+
+def test_variants_are_memoized():
+    cache = SpriteCache()
+    cache.register("p", _sprite())
+    a = cache.variant("p", scale=2.0, flip=True, rotation=10)
+    b = cache.variant("p", scale=2.001, flip=True, rotation=10.2)
+    assert a is b
+    assert a.get_width() > 20  # scaled then rotated
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_respects_memory_budget():
+    sprite = _sprite()
+    cache = SpriteCache(max_bytes=surface_bytes(sprite) * 2)
+    cache.register("p", sprite)
+    first = cache.variant("p", flip=True)
+    cache.variant("p", scale=0.5)
+    cache.variant("p", flip=True)  # touch so it is most recent
+    cache.variant("p", scale=0.9)
+    assert cache.bytes <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+    assert cache.variant("p", flip=True) is first
+
+
+def test_split_strip():
+    frames = split_strip(_sprite(30, 10), 3)
+    assert [f.get_size() for f in frames] == [(10, 10)] * 3
+
+
+def test_animation_frames_loop():
+    anim = Animation([0, 1, 2], fps=10)
+    assert anim.frame_at(0.0).frame == 0
+    assert anim.frame_at(0.25).frame == 2
+    assert anim.frame_at(0.35).frame == 0
+
+
+def test_warm_builds_all_variants():
+    cache = SpriteCache()
+    cache.register("p", _sprite())
+    player = AnimationPlayer(cache, "p", {"idle": idle_animation()}, "idle")
+    player.warm()
+    misses = cache.misses
+    target = _sprite(40, 40)
+    for i in range(20):
+        player.update(0.05)
+        player.draw(target, (20, 20), flip=i % 2 == 0)
+    assert cache.misses == misses
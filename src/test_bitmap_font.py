@@ -0,0 +1,58 @@
+import pygame
+import pytest
+
+from bitmap_font import BitmapFont
+
+
+@pytest.fixture(autouse=True)
+def fonts():
+    pygame.font.init()
+    yield
+    pygame.font.quit()
+
+
+def test_sizes_match_glyph_widths():
+    font = BitmapFont(None, 20)
+    ref = pygame.font.Font(None, 20)
+    assert font.height == ref.get_height()
+    assert font.size("X") == ref.size("X")
+    assert font.size("") == (0, font.height)
+
+
+def test_cache_roundtrip(tmp_path):
+    built = BitmapFont(None, 20, cache_dir=str(tmp_path))
+    assert not built.loaded_from_cache
+    cached = BitmapFont(None, 20, cache_dir=str(tmp_path))
+    assert cached.loaded_from_cache
+    assert cached.size("Inventory") == built.size("Inventory")
+    a = pygame.Surface((120, 30), pygame.SRCALPHA)
+    b = pygame.Surface((120, 30), pygame.SRCALPHA)
+    built.draw(a, "Inventory", (2, 2), (40, 40, 40))
+    cached.draw(b, "Inventory", (2, 2), (40, 40, 40))
+    assert pygame.image.tostring(a, "RGBA") == pygame.image.tostring(b, "RGBA")
+
+
+def test_draw_tints_and_anchors():
+    font = BitmapFont(None, 20)
+    surf = pygame.Surface((60, 40))
+    rect = font.draw(surf, "X", (30, 20), (255, 0, 0), anchor="center")
+    assert rect.center == (30, 20)
+    colors = {tuple(surf.get_at((x, y)))[:3] for x in range(rect.left, rect.right) for y in range(rect.top, rect.bottom)}
+    assert (255, 0, 0) in colors
+    assert all(g == 0 and b == 0 for _, g, b in colors)
+
+
+def test_draw_lines_and_missing_glyphs():
+    font = BitmapFont(None, 20, charset="ab")
+    surf = pygame.Surface((200, 100))
+    rect = font.draw_lines(surf, ["ab", ("zz", (0, 255, 0)), "a"], (10, 10), line_height=22)
+    assert rect.topleft == (10, 10)
+    assert rect.height == 2 * 22 + font.height
+    assert rect.width == max(font.size("ab")[0], font.size("zz")[0])
+    assert "z" in font._glyphs
+
+
+def test_lines_are_reused():
+    font = BitmapFont(None, 20)
+    assert font.line("HP 100/100", (240, 240, 240)) is font.line("HP 100/100", [240, 240, 240])
+    assert font.line("HP 100/100") is not font.line("HP 100/100", (240, 240, 240))
@@ -0,0 +1,69 @@
+import json
+import time
+
+import pytest
+import requests
+
+from fake_backend import FakeBackend, NetworkConditions
+
+
+@pytest.fixture
+def fake():
+    with FakeBackend(seed=1) as backend:
+        yield backend
+
+
+def _login(fake):
+    payload = {"username": "demoUser", "password": "demoPass"}
+    response = requests.post(f"{fake.url}/auth/login", json=payload, timeout=5)
+    assert response.status_code == 200
+    return response.json()["token"]
+
+
+def test_pokemon_add_counts_per_user(fake):
+    headers = {"Authorization": f"Bearer {_login(fake)}"}
+    for expected in (1, 2):
+        response = requests.post(f"{fake.url}/pokemon/add", json={}, headers=headers, timeout=5)
+        assert response.status_code == 200
+        assert response.json()["quantity"] == expected
+
+
+def test_pokemon_add_requires_token(fake):
+    response = requests.post(f"{fake.url}/pokemon/add", json={}, timeout=5)
+    assert response.status_code == 401
+
+
+def test_latency_injection(fake):
+    fake.conditions.latency = 0.2
+    start = time.perf_counter()
+    requests.get(f"{fake.url}/auth/version", timeout=5)
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_dropped_request():
+    with FakeBackend(conditions=NetworkConditions(drop_rate=1.0)) as fake:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            requests.get(f"{fake.url}/auth/version", timeout=5)
+        assert fake.requests == [("GET", "/auth/version", None)]
+
+
+def test_websocket_messages_and_broadcast(fake):
+    ws_client = pytest.importorskip("websockets.sync.client")
+    with ws_client.connect(fake.ws_url) as ws:
+        ws.send(json.dumps({"x": 1, "y": 2}))
+        ws.ping().wait(timeout=2)
+        assert fake.ws_messages == [{"x": 1, "y": 2}]
+        fake.broadcast({"type": "chat", "text": "hi"})
+        assert json.loads(ws.recv(timeout=2)) == {"type": "chat", "text": "hi"}
+
+
+def test_websocket_disconnect_injection(fake):
+    ws_client = pytest.importorskip("websockets.sync.client")
+    from websockets.exceptions import ConnectionClosed
+
+    fake.conditions.disconnect_rate = 1.0
+    with ws_client.connect(fake.ws_url) as ws:
+        ws.send("{}")
+        with pytest.raises(ConnectionClosed):
+            ws.recv(timeout=2)
+    assert fake.disconnects == 1
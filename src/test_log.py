@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+
+import pytest
+
+import log
+
+
+def _record(msg="connection error", args=(), **extra):
+    record = logging.LogRecord("client.ws", logging.WARNING, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_suppresses_repeats(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(log.time, "monotonic", lambda: clock[0])
+    f = log.RateLimitFilter(burst=2, period=10.0)
+    results = [f.filter(_record()) for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    # a different message template is limited separately
+    assert f.filter(_record("other"))
+    clock[0] += 10.0
+    record = _record()
+    assert f.filter(record)
+    assert record.suppressed == 3
+
+
+def test_rate_limit_lets_debug_through():
+    f = log.RateLimitFilter(burst=1, period=10.0)
+    records = [_record("send", data={"x": i}) for i in range(5)]
+    for r in records:
+        r.levelno = logging.DEBUG
+    assert all(f.filter(r) for r in records)
+
+
+def test_json_formatter_includes_extra_fields():
+    line = log.JsonFormatter().format(_record("send %d", (3,), data={"x": 1}))
+    data = json.loads(line)
+    assert data["subsystem"] == "ws"
+    assert data["level"] == "WARNING"
+    assert data["msg"] == "send 3"
+    assert data["data"] == {"x": 1}
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = log.DroppingQueueHandler(queue.Queue(1))
+    handler.emit(_record())
+    handler.emit(_record())
+    assert handler.dropped == 1
+
+
+def test_parse_levels():
+    assert log.parse_levels(["ws=debug", "api=WARNING"]) == {"ws": "DEBUG", "api": "WARNING"}
+    with pytest.raises(ValueError):
+        log.parse_levels(["ws"])
+    with pytest.raises(ValueError):
+        log.parse_levels(["ws=LOUD"])
@@ -0,0 +1,77 @@
+import collections
+
+import pygame
+
+import animation
+from memprof import MemoryProfiler, SurfaceCounter
+
+
+def _make_surface():
+    return pygame.Surface((4, 4))
+
+
+def test_surface_counter_counts_by_call_site():
+    original = pygame.Surface
+    counter = SurfaceCounter()
+    counter.install()
+    try:
+        surf = _make_surface()
+        _make_surface()
+        pygame.transform.flip(surf, True, False)
+        surf.copy()
+        # surfaces created by pygame itself still count as pygame.Surface
+        assert isinstance(pygame.transform.flip(original((2, 2)), True, False), pygame.Surface)
+        cache = animation.SpriteCache()
+        cache.register("p", original((2, 2)))
+        assert cache.frame_count("p") == 1
+    finally:
+        counter.uninstall()
+    assert pygame.Surface is original
+    counts = counter.take()
+    sites = collections.Counter()
+    for site, n in counts.items():
+        if site.startswith("test_memprof.py"):
+            sites[site.split(" ")[1]] += n
+    assert sites["(_make_surface)"] == 2
+    assert sites["(test_surface_counter_counts_by_call_site)"] == 3
+    assert not counter.counts
+
+
+def test_transforms_into_a_dest_surface_are_not_counted():
+    counter = SurfaceCounter()
+    counter.install()
+    try:
+        src = pygame.Surface((4, 4))
+        dest = pygame.Surface((8, 8))
+        counter.take()
+        pygame.transform.scale(src, (8, 8), dest)
+        pygame.transform.smoothscale(src, (8, 8), dest_surface=dest)
+        pygame.transform.scale2x(src, dest)
+        assert sum(counter.take().values()) == 0
+        pygame.transform.scale(src, (8, 8))
+        pygame.transform.scale2x(src)
+        assert sum(counter.take().values()) == 2
+    finally:
+        counter.uninstall()
+
+
+def test_report_lists_growth_surfaces_and_queues(tmp_path):
+    path = tmp_path / "mem.txt"
+    queue = []
+    prof = MemoryProfiler(str(path), every=5)
+    prof.track_queue("test queue", lambda: len(queue))
+    prof.start()
+    kept = []
+    try:
+        for i in range(11):
+            kept.append(bytearray(10000))
+            queue.append(i)
+            _make_surface()
+            prof.frame_end()
+    finally:
+        prof.stop()
+    report = path.read_text()
+    assert report.count("=== frame") == 2
+    assert "test_memprof.py" in report
+    assert "1.00/frame  test_memprof.py" in report
+    assert "test queue: 11 / 11" in report
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+import messages
+import net
+from fake_backend import FakeBackend
+
+
+def test_decode_encode_roundtrip():
+    data = {"type": "player", "user": "ash", "x": 10, "y": 20, "health": 90}
+    msg = messages.decode(data)
+    assert msg == messages.PlayerUpdate("ash", 10, 20, 90)
+    assert messages.encode(msg) == data
+
+
+@pytest.mark.parametrize("data", [[1, 2], {"type": "nope"}, {"type": "chat", "sender": "ash"}])
+def test_decode_rejects_bad_messages(data):
+    with pytest.raises(ValueError):
+        messages.decode(data)
+
+
+@pytest.mark.parametrize("data", [
+    {"type": "player", "user": 7, "x": "a", "y": None, "health": 90},
+    {"type": "player", "user": "ash", "x": 1, "y": None, "health": 90},
+    {"type": "player", "user": "ash", "x": float("nan"), "y": 2, "health": 90},
+    {"type": "player", "user": "ash", "x": 1, "y": 2, "health": "full"},
+    {"type": "player", "user": None, "x": 1, "y": 2, "health": 90},
+    {"type": "spawn", "name": "pidgey", "x": True, "y": 2},
+    {"type": "inventory", "items": "pikachu"},
+    {"type": "inventory", "items": [["nested"]]},
+    {"type": "chat", "sender": {"a": 1}, "text": "hi"},
+])
+def test_decode_rejects_mistyped_fields(data):
+    with pytest.raises(ValueError):
+        messages.decode(data)
+
+
+def test_decode_coerces_field_types():
+    msg = messages.decode({"type": "player", "user": 7, "x": 1, "y": 2.5, "health": 80.9})
+    assert msg == messages.PlayerUpdate("7", 1.0, 2.5, 80)
+    assert type(msg.x) is float and type(msg.health) is int
+    assert messages.decode({"type": "inventory", "items": ["a", 3]}).items == ["a", "3"]
+
+
+def test_drain_respects_budget():
+    d = messages.Dispatcher(budget=0.01)
+    seen = []
+    d.on(messages.Chat, lambda m: (seen.append(m), time.sleep(0.004)))
+    for i in range(10):
+        d.post(messages.Chat("ash", str(i)))
+    handled = d.drain()
+    assert 1 <= len(handled) < 10
+    assert d.pending() == 10 - len(handled)
+    assert d.stats()["deferred_frames"] == 1
+    # zero budget still makes progress
+    assert len(d.drain(budget=0)) == 1
+    d.drain_all()
+    assert [m.text for m in seen] == [str(i) for i in range(10)]
+
+
+def test_decorator_drops_and_failing_handlers():
+    d = messages.Dispatcher(max_pending=2)
+
+    @d.on(messages.Chat)
+    def boom(msg):
+        raise RuntimeError("bad handler")
+
+    assert d.post(messages.Chat("a", "1"))
+    assert d.post(messages.PlayerLeft("b"))
+    assert not d.post(messages.Chat("a", "2"))
+    assert len(d.drain_all()) == 2
+    assert d.stats() == {"pending": 0, "handled": 2, "dropped": 1, "unhandled": 1, "deferred_frames": 0}
+
+
+def test_websocket_client_decodes_server_messages():
+    d = messages.Dispatcher()
+    with FakeBackend(seed=1) as backend:
+        client = net.WebSocketClient(backend.ws_url, on_message=d.post)
+        client.start()
+        try:
+            deadline = time.monotonic() + 10
+            while not backend.ws_clients and time.monotonic() < deadline:
+                time.sleep(0.05)
+            backend.broadcast({"type": "unknown"})
+            backend.broadcast({"type": "chat", "sender": "server", "text": "hello"})
+            while not d.pending() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            client.stop()
+    assert d.drain_all() == [messages.Chat("server", "hello")]
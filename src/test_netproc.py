@@ -0,0 +1,153 @@
+import time
+
+import messages
+import net
+import netproc
+from fake_backend import FakeBackend
+from shm_ring import ShmRing
+from telemetry import NetTelemetry
+
+
+def test_telemetry_record_roundtrip():
+    t = NetTelemetry()
+    t.record_rtt(0.05)
+    t.record_connected()
+    t.record_http("/pokemon/add", 0.2, 200)
+    s = netproc.decode_telemetry(netproc.encode_telemetry(t.snapshot()))
+    assert s["rtt_last"] == 0.05
+    assert s["connected"] is True
+    assert s["http"]["/pokemon/add"]["count"] == 1
+    empty = netproc.decode_telemetry(netproc.encode_telemetry(NetTelemetry().snapshot()))
+    assert empty["rtt_last"] is None
+    assert empty["http"] == {}
+
+
+def test_catch_result_records_never_fail_to_pack():
+    assert netproc.decode_catch_result(netproc.encode_catch_result(True, 7)) == (True, 7)
+    assert netproc.decode_catch_result(netproc.encode_catch_result(False, None)) == (False, None)
+    for bad in (2.5, "3", 2**40, -4, True):
+        assert netproc.decode_catch_result(netproc.encode_catch_result(True, bad)) == (True, None)
+
+
+def test_add_pokemon_quantity_is_validated():
+    assert net._quantity(3) == 3
+    assert net._quantity(3.0) == 3
+    assert net._quantity("4") == 4
+    for bad in (None, 2.5, "many", True, [1]):
+        assert net._quantity(bad) is None
+
+
+def test_inventory_records_split_to_fit_slots():
+    items = [f"pokemon-{i}" for i in range(100)] + ["é" * 40]
+    records = netproc.encode_inventory(items, slot_size=64)
+    assert len(records) > 1 and all(len(r) <= 62 for r in records)
+    decoded = [netproc.decode_inventory(r) for r in records]
+    assert [replace for replace, _ in decoded] == [True] + [False] * (len(records) - 1)
+    joined = [item for _, chunk in decoded for item in chunk]
+    assert joined[:100] == items[:100] and joined[100] == "é" * 16
+    assert netproc.encode_inventory([]) == [bytes([netproc.REC_INVENTORY, netproc.INV_REPLACE]) + b"[]"]
+
+
+def test_poll_stops_at_budget():
+    received = []
+    proc = netproc.NetProcess("http://unused", "ws://unused", on_message=received.append)
+    proc.rx = ShmRing.create(16, netproc.SLOT_SIZE)
+    try:
+        for i in range(10):
+            proc.rx.push(netproc.encode_message(messages.Chat("ash", str(i))))
+        proc.poll(budget=0)
+        assert len(received) == 1 and len(proc.rx) == 9
+        proc.poll()
+        assert [m.text for m in received] == [str(i) for i in range(10)]
+    finally:
+        proc.stop()
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_helper_sends_state_and_catches():
+    with FakeBackend(seed=1) as backend:
+        inbound = []
+        proc = netproc.NetProcess(backend.url, backend.ws_url, token="valid_demo_token", log_file="",
+                                  on_message=inbound.append)
+        proc.start()
+        try:
+            results = []
+            proc.catch("enemy")
+            assert _wait_for(lambda: results.extend(proc.poll()) or results)
+            assert results == [(True, 1)]
+            proc.send_state({"x": 10, "y": 20, "health": 90, "inventory": ["enemy"], "timestamp": 123.5})
+            assert _wait_for(lambda: backend.ws_messages)
+            assert backend.ws_messages[0] == {"x": 10, "y": 20, "health": 90, "inventory": ["enemy"],
+                                              "timestamp": 123.5}
+            # a server push replaced the game's inventory; the helper follows it
+            proc.send_state({"x": 10, "y": 20, "health": 90, "inventory": ["pidgey", "rattata"],
+                             "timestamp": 124.0})
+            assert _wait_for(lambda: len(backend.ws_messages) > 1)
+            assert backend.ws_messages[1]["inventory"] == ["pidgey", "rattata"]
+            backend.broadcast({"type": "spawn", "name": "pidgey", "x": 5, "y": 6})
+            assert _wait_for(lambda: proc.poll() is not None and inbound)
+            assert inbound == [messages.Spawn("pidgey", 5, 6)]
+        finally:
+            proc.stop()
+        assert proc.tx is None
+
+
+def test_helper_stops_when_the_game_goes_away():
+    proc = netproc.NetProcess("http://127.0.0.1:9", "ws://127.0.0.1:9/ws", log_file="")
+    proc.start()
+    helper = proc.proc
+    try:
+        # what the OS does to the pipe when the game process dies
+        helper.stdin.close()
+        assert _wait_for(lambda: helper.poll() is not None)
+    finally:
+        proc.proc = None
+        proc.stop()
+
+
+def test_catch_result_gets_through_a_message_burst():
+    with FakeBackend(seed=1) as backend:
+        inbound = []
+        proc = netproc.NetProcess(backend.url, backend.ws_url, token="valid_demo_token", log_file="",
+                                  slot_count=64, on_message=inbound.append)
+        proc.start()
+        try:
+            assert _wait_for(lambda: backend.ws_clients)
+            for i in range(400):
+                backend.broadcast({"type": "chat", "sender": "server", "text": str(i)})
+            # the game isn't reading: messages fill the ring up to the reserve
+            assert _wait_for(lambda: len(proc.rx) >= 64 - netproc.CONTROL_RESERVE)
+            proc.catch("enemy")
+            results = []
+            assert _wait_for(lambda: results.extend(proc.poll(budget=0)) or results)
+            assert results == [(True, 1)]
+            assert _wait_for(lambda: proc.poll() is not None and len(inbound) == 400)
+            assert [m.text for m in inbound] == [str(i) for i in range(400)]
+        finally:
+            proc.stop()
+
+
+def test_dead_helper_is_noticed_once():
+    proc = netproc.NetProcess("http://127.0.0.1:9", "ws://127.0.0.1:9/ws", log_file="")
+    proc.start()
+    try:
+        proc._snapshot = dict(proc._snapshot, connected=True, rtt_last=0.05)
+        proc.proc.kill()
+        proc.proc.wait()
+        queued = len(proc.tx)
+        proc.send_state({"x": 1, "y": 2, "health": 3, "inventory": [], "timestamp": 0.0})
+        proc.catch("enemy")
+        assert len(proc.tx) == queued
+        assert not proc.alive()
+        assert proc.snapshot()["connected"] is False and proc.snapshot()["rtt_last"] is None
+        assert proc.poll() == []
+    finally:
+        proc.stop()
@@ -0,0 +1,39 @@
+import pygame
+
+import pacing
+from pacing import FramePacer
+
+
+def test_busy_scene_runs_at_full_rate():
+    p = FramePacer(idle_grace=0.5)
+    assert p.choose_mode(True, True, now=10.0) == pacing.ACTIVE
+    assert p.choose_mode(False, True, now=10.4) == pacing.ACTIVE
+
+
+def test_static_scene_goes_idle_after_grace():
+    p = FramePacer(idle_grace=0.5)
+    p.choose_mode(True, True, now=10.0)
+    assert p.choose_mode(False, True, now=10.6) == pacing.IDLE
+    # input brings it straight back
+    assert p.choose_mode(True, True, now=10.7) == pacing.ACTIVE
+
+
+def test_unfocused_window_is_inactive():
+    p = FramePacer()
+    assert p.choose_mode(True, False, now=1.0) == pacing.INACTIVE
+
+
+def test_throttle_disabled():
+    p = FramePacer(throttle=False)
+    p.choose_mode(False, True, now=0.0)
+    assert p.choose_mode(False, False, now=100.0) == pacing.ACTIVE
+
+
+def test_tick_caps_dt_after_a_stall(monkeypatch):
+    p = FramePacer(throttle=False, fps_cap=0)
+    monkeypatch.setattr(pygame.display, "get_active", lambda: True)
+    monkeypatch.setattr(pygame.key, "get_focused", lambda: True)
+    # a 2.5 s frame
+    p.clock = type("StalledClock", (), {"tick": lambda self: 2500})()
+    assert p.tick(True) == pacing.MAX_DT
+    assert p.raw_dt == 2.5
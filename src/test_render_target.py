@@ -0,0 +1,52 @@
+import os
+
+import pygame
+import pytest
+
+from render_target import RenderTarget, parse_size
+
+
+def test_parse_size():
+    assert parse_size("640x360") == (640, 360)
+    assert parse_size("1920X1080") == (1920, 1080)
+    with pytest.raises(ValueError):
+        parse_size("640")
+    with pytest.raises(ValueError):
+        parse_size("0x360")
+
+
+@pytest.fixture
+def display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    yield
+    pygame.display.quit()
+
+
+def test_letterboxed_mouse_mapping(display):
+    # 4:3 window showing a 16:9 logical surface: bars above and below
+    rt = RenderTarget((640, 360), (800, 600))
+    assert rt.to_logical((0, 75)) == (0, 0)
+    assert rt.to_logical((400, 300)) == (320, 180)
+    event = rt.map_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(800, 525), button=1))
+    assert event.pos == (640, 360)
+    assert event.button == 1
+
+
+def test_present_scales_into_window(display):
+    rt = RenderTarget((64, 36), (128, 72))
+    rt.surface.fill((255, 0, 0))
+    rt.present()
+    assert rt.window.get_at((127, 71))[:3] == (255, 0, 0)
+
+
+def test_zero_area_window_is_skipped(display, monkeypatch):
+    rt = RenderTarget((64, 36), (128, 72))
+    minimised = pygame.Surface((0, 0))
+    monkeypatch.setattr(pygame.display, "get_surface", lambda: minimised)
+    rt.present()
+    assert rt.to_logical((10, 10)) == (0, 0)
+    monkeypatch.undo()
+    rt.surface.fill((255, 0, 0))
+    rt.present()
+    assert rt.window.get_at((127, 71))[:3] == (255, 0, 0)
@@ -0,0 +1,61 @@
+import gzip
+
+import pytest
+
+import replay
+
+
+def _record(path):
+    rec = replay.Recorder(str(path), seed=1234, wall_offset=1.7e9, size=(640, 360), enemies=40)
+    rec.frame(10.0, 0.016, 0b101, (5, 7), [])
+    rec.frame(10.016, 0.016, 0, (6, 7), [replay.Event(replay.EV_KEYDOWN, 10.01, 1073741906, 0, 0, 0)])
+    rec.message(replay.MSG_STATE, {"x": 1, "y": 2})
+    rec.inbound({"type": "chat", "sender": "ash", "text": "hi"})
+    rec.close()
+
+
+def test_roundtrip(tmp_path):
+    path = tmp_path / "session.rec"
+    _record(path)
+    seed, wall_offset, size, enemies, frames = replay.read_session(str(path))
+    assert seed == 1234
+    assert wall_offset == 1.7e9
+    assert size == (640, 360)
+    assert enemies == 40
+    assert len(frames) == 2
+    assert frames[0].keymask == 0b101
+    assert frames[0].mouse == (5, 7)
+    assert frames[1].events[0].key == 1073741906
+    assert frames[1].messages == [(replay.MSG_STATE, {"x": 1, "y": 2})]
+    assert frames[0].inbound == []
+    assert frames[1].inbound == [{"type": "chat", "sender": "ash", "text": "hi"}]
+
+
+def test_replayer_counts_mismatches(tmp_path):
+    path = tmp_path / "session.rec"
+    _record(path)
+    r = replay.Replayer(str(path))
+    r.next_frame()
+    # unexpected message on the first frame
+    assert r.message(replay.MSG_STATE, {"x": 1, "y": 2}) is False
+    r.next_frame()
+    assert r.message(replay.MSG_STATE, {"y": 2, "x": 1}) is True
+    r.finish()
+    assert r.done
+    assert r.mismatches == 1
+
+
+def test_key_mask_roundtrip():
+    tracked = (100, 200, 300)
+    pressed = {100: True, 200: False, 300: True}
+    mask = replay.key_mask(pressed, tracked)
+    keys = replay.KeyMask(mask, tracked)
+    assert keys[100] and keys[300] and not keys[200]
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "bad.rec"
+    with gzip.open(str(path), "wb") as f:
+        f.write(b"NOPE" + bytes(replay._HEADER.size - 4))
+    with pytest.raises(replay.ReplayError):
+        replay.read_session(str(path))
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from shm_ring import ShmRing
+
+
+@pytest.fixture
+def ring():
+    r = ShmRing.create(slot_count=4, slot_size=16)
+    yield r
+    r.close()
+    r.unlink()
+
+
+def test_fifo_and_wraparound(ring):
+    for round_ in range(3):
+        for i in range(3):
+            assert ring.push(bytes([round_, i]))
+        assert len(ring) == 3
+        assert ring.drain() == [bytes([round_, i]) for i in range(3)]
+    assert ring.pop() is None
+
+
+def test_full_ring_drops(ring):
+    for i in range(4):
+        assert ring.push(bytes([i]))
+    assert ring.push(b"x") is False
+    assert ring.dropped == 1
+    assert ring.pop() == b"\x00"
+    assert ring.push(b"y")
+
+
+def test_record_too_large(ring):
+    with pytest.raises(ValueError):
+        ring.push(bytes(15))
+
+
+def test_attach_from_another_process(ring):
+    ring.push(b"ping")
+    code = (f"from shm_ring import ShmRing; r = ShmRing.attach({ring.name!r}, 4, 16); "
+            "assert r.pop() == b'ping'; r.push(b'pong'); r.close()")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    assert ring.drain() == [b"pong"]
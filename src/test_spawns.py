@@ -0,0 +1,136 @@
+import math
+import random
+
+import spawns
+from spawns import SpatialGrid, SpawnScheduler, Spawner, poisson_disk
+
+AREA = (64, 64, 1152, 592)
+
+
+def test_poisson_disk_spacing_and_bounds():
+    points = poisson_disk(AREA, 40, random.Random(1))
+    assert len(points) > 100
+    x0, y0, w, h = AREA
+    for x, y in points:
+        assert x0 <= x < x0 + w and y0 <= y < y0 + h
+    grid = SpatialGrid(40)
+    for i, p in enumerate(points):
+        assert not [j for j in grid.query(p, 40) if math.dist(points[j], p) < 40 - 1e-9]
+        grid.insert(i, p)
+
+
+def test_poisson_disk_is_deterministic():
+    assert poisson_disk(AREA, 50, random.Random(7)) == poisson_disk(AREA, 50, random.Random(7))
+
+
+def test_grid_query():
+    grid = SpatialGrid(10)
+    grid.insert("a", (0, 0))
+    grid.insert("b", (5, 5))
+    grid.insert("c", (30, 0))
+    assert grid.query((0, 0), 8) == ["a", "b"]
+    grid.insert("b", (100, 100))
+    assert grid.query((0, 0), 8) == ["a"]
+    grid.remove("a")
+    assert grid.query((0, 0), 8) == []
+    assert len(grid) == 2
+
+
+def test_scheduler_order_and_cancel():
+    s = SpawnScheduler()
+    s.schedule(1, 5.0)
+    s.schedule(2, 3.0)
+    s.schedule(3, 4.0)
+    s.cancel(3)
+    s.schedule(1, 6.0)  # rescheduling replaces the earlier entry
+    assert s.next_due() == 3.0
+    assert s.pop_due(5.5) == [2]
+    assert s.pop_due(10.0) == [1]
+    assert s.next_due() is None
+    assert len(s) == 0
+
+
+def _spawner(slots, **kwargs):
+    return Spawner([AREA], min_dist=60, slots=slots, rng=random.Random(3), **kwargs)
+
+
+def test_spawn_all_keeps_away_from_player_and_each_other():
+    player = (640, 360)
+    sp = _spawner(100, safe_dist=200)
+    sp.spawn_all(0.0, player)
+    alive = sp.alive()
+    assert len(alive) == 100
+    assert len({slot.point for slot in alive}) == 100
+    for slot in alive:
+        assert math.dist(slot.pos, player) > 200
+
+
+def test_despawn_schedules_respawn():
+    sp = _spawner(5, respawn=(3.0, 7.0))
+    sp.spawn_all(0.0)
+    slot = sp.slots[2]
+    sp.despawn(slot, 10.0)
+    assert not slot.alive
+    assert 13.0 <= sp.next_due() <= 17.0
+    assert sp.update(12.9) == []
+    assert sp.update(17.0) == [slot]
+    assert slot.alive and sp.next_due() is None
+
+
+def test_no_free_point_retries_later():
+    sp = _spawner(2)
+    sp.spawn_all(0.0, (640, 360))
+    sp.safe_dist = 10000  # every point is too close now
+    sp.despawn(sp.slots[0], 0.0)
+    due = sp.next_due()
+    assert sp.update(due, (640, 360)) == []
+    assert sp.next_due() == due + sp.retry
+
+
+def test_pick_gives_up_when_free_points_crowd_the_player():
+    player = (640, 360)
+    sp = _spawner(1, safe_dist=300)
+    far = [p for p in range(len(sp.points)) if math.dist(sp.points[p], player) > 300]
+    for p in far[1:]:
+        sp._take_point(p)  # one free point left away from the player
+    picks = []
+    sp.rng = random.Random(0)
+    real = sp.rng.randrange
+    sp.rng.randrange = lambda n: picks.append(n) or real(n)
+    spawned = sp.spawn(sp.slots[0], player)
+    assert len(picks) <= spawns.PICK_ATTEMPTS
+    assert spawned == (sp.slots[0].point == far[0])
+
+
+def test_place_uses_a_dead_slot():
+    sp = _spawner(2)
+    sp.spawn(sp.slots[0])
+    slot = sp.place((100, 100), "pidgey")
+    assert slot is sp.slots[1] and slot.name == "pidgey"
+    assert sp.near((105, 100), 10) == [slot]
+    # all alive: the first slot is moved, and its spawn point is free again
+    free = sp.stats()["free_points"]
+    assert sp.place((200, 200), "rattata") is sp.slots[0]
+    assert sp.slots[0].point is None and sp.stats()["free_points"] == free + 1
+
+
+def test_place_keeps_the_slot_being_caught():
+    sp = _spawner(2)
+    sp.spawn_all(0.0)
+    caught = sp.slots[0]
+    pos = caught.pos
+    moved = sp.place((200, 200), "rattata", keep=caught)
+    assert moved is sp.slots[1] and moved.pos == (200, 200)
+    assert caught.alive and caught.pos == pos and caught.name is None
+    # a single slot that is being caught can't be replaced at all
+    one = _spawner(1)
+    one.spawn_all(0.0)
+    assert one.place((200, 200), "rattata", keep=one.slots[0]) is None
+    assert one.slots[0].name is None
+
+
+def test_more_slots_than_points():
+    sp = _spawner(10000)
+    sp.spawn_all(0.0)
+    assert len(sp.alive()) == len(sp.points)
+    assert sp.stats()["pending"] == 10000 - len(sp.points)
@@ -0,0 +1,50 @@
+from telemetry import NetTelemetry, PrometheusExporter, RateCounter
+
+
+def test_rate_counter_window():
+    """Only samples inside the window count towards the rate."""
+    rc = RateCounter(window=2.0)
+    rc.add(10, now=0.0)
+    rc.add(10, now=1.5)
+    assert rc.rate(now=1.5) == 10.0
+    assert rc.rate(now=3.0) == 5.0
+    assert rc.total == 20
+
+
+def test_reconnects_counted_after_first_connect():
+    t = NetTelemetry()
+    t.record_connected()
+    t.record_disconnected(error=True)
+    t.record_connected()
+    s = t.snapshot()
+    assert s["connected"] is True
+    assert s["reconnects"] == 1
+    assert s["connection_errors"] == 1
+
+
+def test_prometheus_output():
+    t = NetTelemetry()
+    t.record_rtt(0.025)
+    t.record_send(120)
+    t.set_queue_depth(3)
+    t.record_http("/pokemon/add", 0.2, 200)
+    t.record_http("/pokemon/add", 0.4, None)
+    text = t.to_prometheus()
+    assert "# TYPE game_client_ws_rtt_seconds gauge" in text
+    assert "game_client_ws_rtt_seconds 0.025" in text
+    assert "game_client_ws_sent_bytes_total 120" in text
+    assert "game_client_ws_send_queue_depth 3" in text
+    assert "# TYPE game_client_http_request_duration_seconds summary" in text
+    assert "_sum counter" not in text and "_count counter" not in text
+    assert 'game_client_http_request_duration_seconds_sum{endpoint="/pokemon/add"} 0.6' in text
+    assert 'game_client_http_request_duration_seconds_count{endpoint="/pokemon/add"} 2' in text
+    assert 'game_client_http_request_errors_total{endpoint="/pokemon/add"} 1' in text
+
+
+def test_exporter_writes_file(tmp_path):
+    t = NetTelemetry()
+    t.record_send(5)
+    path = str(tmp_path / "client.prom")
+    PrometheusExporter(t, path).write()
+    with open(path) as f:
+        assert "game_client_ws_sent_messages_total 1" in f.read()
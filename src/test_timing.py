@@ -0,0 +1,25 @@
+from timing import LatencyStats
+
+
+def test_latency_percentiles():
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.add(ms / 1000.0)
+    s = stats.summary()
+    assert s["count"] == 100
+    assert abs(s["p50"] - 0.050) < 0.0015
+    assert abs(s["p99"] - 0.099) < 0.0015
+    assert s["max"] == 0.1
+
+
+def test_latency_window_keeps_total_count():
+    stats = LatencyStats(maxlen=10)
+    for _ in range(25):
+        stats.add(0.01)
+    stats.add(0.5)
+    assert stats.count == 26
+    assert stats.percentile(100) == 0.5
+
+
+def test_empty_summary():
+    assert LatencyStats().summary()["p50"] is None
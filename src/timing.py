@@ -0,0 +1,77 @@
+"""High-resolution monotonic timing for input handling.
+
+Game time comes from time.perf_counter(), which is monotonic and sub-microsecond,
+instead of the wall clock. InputTimer does the frame-cap sleep in
+pygame.event.wait() so events that arrive while the loop is idle are stamped
+when they arrive, not when the next frame polls them. LatencyStats keeps the
+distribution of input-to-display latency.
+"""
+import collections
+import time
+
+import pygame
+
+now = time.perf_counter
+
+# events that count as player input for latency measurement
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN)
+
+
+def wall_offset():
+    """Offset that converts now() readings to wall-clock (epoch) seconds."""
+    return time.time() - now()
+
+
+class InputTimer:
+    """Collects pygame events together with the time they were seen."""
+
+    def __init__(self):
+        self._stash = []
+
+    def wait_until(self, deadline, wake_on_event=False):
+        """Sleep until deadline (a now() value), stamping events as they arrive."""
+        while True:
+            remaining = deadline - now()
+            if remaining <= 0:
+                return
+            ev = pygame.event.wait(max(1, int(remaining * 1000)))
+            if ev.type == pygame.NOEVENT:
+                continue
+            self._stash.append((ev, now()))
+            if wake_on_event:
+                return
+
+    def get(self):
+        """Return all pending events as (event, timestamp) pairs, oldest first."""
+        t = now()
+        events = self._stash + [(ev, t) for ev in pygame.event.get()]
+        self._stash = []
+        return events
+
+
+def _pick(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+class LatencyStats:
+    """Rolling latency samples with percentile summaries (seconds)."""
+
+    def __init__(self, maxlen=4096):
+        self._samples = collections.deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p):
+        if not self._samples:
+            return None
+        return _pick(sorted(self._samples), p)
+
+    def summary(self):
+        if not self._samples:
+            return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+        ordered = sorted(self._samples)
+        return {"count": self.count, "p50": _pick(ordered, 50), "p90": _pick(ordered, 90),
+                "p99": _pick(ordered, 99), "max": ordered[-1]}